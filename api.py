@@ -1,63 +1,67 @@
 import datetime as dt
-import os
-from pathlib import Path
 
 import pandas as pd
-import requests
-from dotenv import load_dotenv
 
-
-env_file = Path(__file__).resolve().parent / '.env'
-load_dotenv(env_file)
-POLYGON_API_KEY = os.environ.get('POLYGON_API_KEY')
+from constants import ASSETS_LIMIT, ASSETS_PAGE_LIMIT, COINCAP_BASE_URL, FNG_BASE_URL
+from http_client import get_json
+from metrics import timed_parse
 
 
 def get_exchange_rates() -> pd.DataFrame:
-    url = 'https://api.coincap.io/v2/rates'
-    try:
-        response = requests.get(url)
-        response_data = response.json()["data"]
-    except:
-        response_data = [{
-            'id': '',
-            'symbol': '',
-            'currencySymbol': '',
-            'type': '',
-            'rateUsd': ''
-        }]
-    df = (
-        pd
-        .DataFrame(response_data)
-        .astype({'symbol': 'str', 'rateUsd': 'float64'})
-    )
+    url = f'{COINCAP_BASE_URL}/v2/rates'
+    response_data = get_json('coincap.rates', url, 'data')
+    with timed_parse('coincap.rates'):
+        df = (
+            pd
+            .DataFrame(
+                response_data,
+                columns=['id', 'symbol', 'currencySymbol', 'type', 'rateUsd']
+            )
+            .astype({'symbol': 'str', 'rateUsd': 'float64'})
+        )
     return df
 
 
-def get_assets() -> pd.DataFrame:
-    url = 'http://api.coincap.io/v2/assets?limit=10'
-    try:
-        response = requests.get(url)
-        response_data = response.json()['data']
-    except:
-        response_data = {
-            'id': [], 'rank': [], 'symbol': [], 'name': [], 'supply': [],
-            'maxSupply': [], 'marketCapUsd': [], 'volumeUsd24Hr': [], 'priceUsd': [],
-            'changePercent24Hr': [], 'vwap24Hr': [], 'explorer': [],
-        }
-    df = (
-        pd
-        .DataFrame(response_data)
-        .astype({
-            'rank': 'int64',
-            'supply': 'float64',
-            'maxSupply': 'float64',
-            'marketCapUsd': 'float64',
-            'volumeUsd24Hr': 'float64',
-            'priceUsd': 'float64',
-            'changePercent24Hr': 'float64',
-            'vwap24Hr': 'float64',
-        })
-    )
+def get_assets(limit: int = ASSETS_LIMIT) -> pd.DataFrame:
+    # Pages through the ranking until a short page, or until `limit` assets
+    # when it is not 0
+    response_data = []
+    while not limit or len(response_data) < limit:
+        page_limit = ASSETS_PAGE_LIMIT
+        if limit:
+            page_limit = min(page_limit, limit - len(response_data))
+        url = (
+            f'{COINCAP_BASE_URL}/v2/assets?' +
+            f'limit={page_limit}&offset={len(response_data)}'
+        )
+        page = get_json('coincap.assets', url, 'data')
+        response_data.extend(page)
+        if len(page) < page_limit:
+            break
+    with timed_parse('coincap.assets'):
+        df = (
+            pd
+            .DataFrame(
+                response_data,
+                columns=[
+                    'id', 'rank', 'symbol', 'name', 'supply', 'maxSupply',
+                    'marketCapUsd', 'volumeUsd24Hr', 'priceUsd',
+                    'changePercent24Hr', 'vwap24Hr', 'explorer',
+                ]
+            )
+            .astype({
+                'rank': 'int64',
+                'supply': 'float64',
+                'maxSupply': 'float64',
+                'marketCapUsd': 'float64',
+                'volumeUsd24Hr': 'float64',
+                'priceUsd': 'float64',
+                'changePercent24Hr': 'float64',
+                'vwap24Hr': 'float64',
+            })
+            # The ranking can shift between two page requests
+            .drop_duplicates(subset=['id'])
+        )
     return df
 
 
@@ -78,74 +82,31 @@ def get_asset_history(
         .timestamp() * 1000
     )  # In miliseconds
     url = (
-        f"http://api.coincap.io/v2/assets/{currency}/history?" +
+        f"{COINCAP_BASE_URL}/v2/assets/{currency}/history?" +
         f"interval={interval}&start={unix_start}&end={unix_end}"
     )
-    try:
-        response = requests.get(url)
-        response_data = response.json()['data']
-    except:
-        response_data = {'priceUsd': [], 'time': []}
-    df_cleaned = (
-        pd
-        .DataFrame(response_data)
-        .loc[:, ['priceUsd', 'time']]
-        .astype({'priceUsd': 'float64', 'time': 'datetime64[ms]'})
-        .rename(columns={'time': 'timestamp'})
-    )
+    response_data = get_json('coincap.history', url, 'data')
+    with timed_parse('coincap.history'):
+        df_cleaned = (
+            pd
+            .DataFrame(response_data, columns=['priceUsd', 'time'])
+            .astype({'priceUsd': 'float64', 'time': 'datetime64[ms]'})
+            .rename(columns={'time': 'timestamp'})
+        )
     return df_cleaned
 
 
 def get_fear_greed_data() -> pd.DataFrame:
-    url = 'https://api.alternative.me/fng/?limit=365&date_format=us'
-    try:
-        response = requests.get(url)
-        response_data = response.json()['data']
-    except:
-        response_data = {
-            'value': [],
-            'value_classification': [],
-            'timestamp': [],
-        }
-    df = pd.DataFrame(response_data)
-    df_clean = (
-        df
-        .loc[:, ['value', 'value_classification', 'timestamp']]
-        .astype({'value': 'int64', 'timestamp': 'datetime64[ms]'})
-        .sort_values(by=['timestamp'], ascending=False)
-    )
+    url = f'{FNG_BASE_URL}/fng/?limit=365&date_format=us'
+    response_data = get_json('alternative.fng', url, 'data')
+    with timed_parse('alternative.fng'):
+        df = pd.DataFrame(
+            response_data,
+            columns=['value', 'value_classification', 'timestamp']
+        )
+        df_clean = (
+            df
+            .astype({'value': 'int64', 'timestamp': 'datetime64[ms]'})
+            .sort_values(by=['timestamp'], ascending=False)
+        )
     return df_clean
-
-
-def get_rsi_data() -> pd.DataFrame:
-    url = (
-        f'https://api.polygon.io/v1/indicators/rsi/X:BTCUSD' +
-        f'?timespan=hour&window=14&series_type=close&expand_underlying=false' +
-        f'&order=desc&limit=700&apiKey={POLYGON_API_KEY}'
-    )
-    try:
-        response = requests.get(url)
-        response_data = response.json()["results"]["values"]
-    except:
-        response_data = {'timestamp': [], 'value': []}
-    df = (
-        pd
-        .DataFrame(response_data)
-        .astype({'timestamp': 'datetime64[ms]'})
-    )
-    return df
-
-
-def get_ma_data(window: str, ma_type: str) -> pd.DataFrame:
-    url = (
-        f'https://api.polygon.io/v1/indicators/{ma_type}/X:BTCUSD?' +
-        f'timespan=hour&window={window}&series_type=close&order=desc&limit=700' +
-        f'&apiKey={POLYGON_API_KEY}'
-    )
-    try:
-        response = requests.get(url)
-        response_data = response.json()["results"]["values"]
-    except:
-        response_data = {'timestamp': [], 'value': []}
-    df = pd.DataFrame(response_data).astype({'timestamp': 'datetime64[ms]'})
-    return df
@@ -1,83 +1,310 @@
 import datetime as dt
+import uuid
 from dateutil import parser
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import dash
 import dash_bootstrap_components as dbc
-import plotly.express as px
-from dash import Input, Output, State
-from plotly.graph_objects import Figure
-
-from api import get_assets, get_fear_greed_data, get_rsi_data
-from constants import CURRENCY_SYMBOLS, COLORS
+import pandas as pd
+from dash import html, ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
+from flask import abort, jsonify, request, Response
+
+from cache import LRUCache
+from constants import (
+    CLIENTSIDE_CALLBACKS, CURRENCY_SYMBOLS, FAST_JSON, FIGURE_CACHE_SIZE,
+    LAZY_STARTUP, MA_WINDOWS, MAIN_GRAPH_MAX_POINTS, NAMED_TIME_RANGES,
+    PRICE_DIGITS, PRICE_STREAM_MAX_POINTS, PROFILER_ENABLED, RANKING_PAGE_SIZE,
+    RSI_WINDOW, STREAM_PRICES
+)
+from datasets import (
+    ASSETS, FIAT_RATES, MAIN_GRAPH, FNG, HOURLY_PRICES, PRICE_STREAM, SCHEDULER,
+    get_asset_names, get_moving_averages, get_ranking_table, get_rsi
+)
+from figures import (
+    FigureDict, colored_line_figure, line_figure, placeholder_figure
+)
 from layout.main_layout import render_layout
-from utils import clean_price_data, clean_ma_data, clean_exchange_rates
+from layout.tab_sections import fng
+from metrics import PROFILER, REGISTRY, instrument_callbacks
+from models import rates_cache
+from serialization import configure_json_engine, round_significant
+from timeseries import TimeSeries
+from utils import downsample_price_data
 
 
 ListOfDicts = List[Dict[str, Any]]
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.config.suppress_callback_exceptions = True
+configure_json_engine(FAST_JSON)
+
+
+if LAZY_STARTUP:
+    SCHEDULER.start(load_first=True)
+else:
+    SCHEDULER.load_all()
+    SCHEDULER.start()
+if STREAM_PRICES:
+    PRICE_STREAM.start()
+
 
+def server_callback(*args, **kwargs) -> Callable:
+    # In clientside mode these outputs are computed in the browser from the
+    # data stores (see assets/clientside.js), so the functions are only
+    # registered as server callbacks in the default mode
+    if CLIENTSIDE_CALLBACKS:
+        return lambda func: func
+    return app.callback(*args, **kwargs)
 
-DF_CRYPTO_ASSETS = get_assets()
-CRYPTO_ASSET_NAMES = DF_CRYPTO_ASSETS.loc[:, 'id'].to_list()
-FIAT_CURRENCY_RATES = clean_exchange_rates(
-    date=dt.date.today(),
-    currency_names=['USD', 'EUR', 'GBP', 'PLN', 'CHF'],
+
+@app.callback(
+    [
+        Output('data-ready-poll', 'disabled'),
+        Output('crypto-dropdown', 'options'),
+        Output('rsi-asset', 'options'),
+        Output('ma-asset', 'options'),
+        Output('fng-table', 'children'),
+    ],
+    Input('data-ready-poll', 'n_intervals')
 )
+def display_loaded_data(_: int) -> Tuple[Any]:
+    if ASSETS.is_ready:
+        asset_names = get_asset_names()
+    else:
+        asset_names = []
+    if FNG.is_ready:
+        fng_table = fng.render_fng_table(FNG.get().frame)
+    else:
+        fng_table = fng.render_fng_placeholder()
+    return SCHEDULER.is_ready, asset_names, asset_names, asset_names, fng_table
+
 
 ##### Main crypto graph section #####
-DF_MAIN_GRAPH = clean_price_data(
-    start=dt.datetime(2015, 1, 1),
-    end=dt.datetime.now(),
-    currencies=CRYPTO_ASSET_NAMES
-)
+MAIN_FIGURE_CACHE = LRUCache('main_figure', maxsize=FIGURE_CACHE_SIZE)
 
 
-@app.callback(
-    Output("crypto-graph", "figure"),
+# With streamed prices, every new figure also resets where the stream
+# picks up (see extend_main_crypto_series)
+MAIN_GRAPH_OUTPUT = Output("crypto-graph", "figure")
+if STREAM_PRICES:
+    MAIN_GRAPH_OUTPUT = [MAIN_GRAPH_OUTPUT, Output('price-stream-start', 'data')]
+
+
+@server_callback(
+    MAIN_GRAPH_OUTPUT,
     [
         Input("crypto-dropdown", "value"),
         Input('base-currency', 'value'),
         Input('start-date-picker', 'date'),
-        Input('end-date-picker', 'date')
+        Input('end-date-picker', 'date'),
+        Input('crypto-graph', 'relayoutData'),
+        Input('data-ready-poll', 'n_intervals')
     ]
 )
 def display_main_crypto_series(
     crypto_dropdown: str,
     base_currency: str,
     start_date: str,
-    end_date: str
-) -> Figure:
+    end_date: str,
+    relayout_data: Dict[str, Any],
+    _: int
+) -> Any:
+    fig = main_crypto_figure(
+        crypto_dropdown, base_currency, start_date, end_date, relayout_data
+    )
+    if not STREAM_PRICES:
+        return fig
+    return fig, stream_start(fig, crypto_dropdown, base_currency)
+
+
+def main_crypto_figure(
+    crypto_dropdown: str,
+    base_currency: str,
+    start_date: str,
+    end_date: str,
+    relayout_data: Dict[str, Any]
+) -> FigureDict:
+    if not (MAIN_GRAPH.is_ready and FIAT_RATES.is_ready):
+        return placeholder_figure('Loading price history...')
+    cryptos = selected_cryptos(crypto_dropdown)
     start_time = parser.isoparse(start_date)
     end_time = parser.isoparse(end_date)
-    fiat_curr_rate = FIAT_CURRENCY_RATES[base_currency]
-    df = (
-        DF_MAIN_GRAPH
-        .loc[lambda x: x['timestamp'].between(start_time, end_time)]
-        .set_index('timestamp')
-        .multiply(fiat_curr_rate)
-        .reset_index()
-        .rename(columns={'timestamp': 'date'})
+    # A new selection resets the zoom (see uirevision), so the previous
+    # zoom range only applies to the other triggers
+    triggered_ids = {
+        trigger['prop_id'].split('.')[0]
+        for trigger in dash.callback_context.triggered
+    }
+    selection_ids = {'crypto-dropdown', 'start-date-picker', 'end-date-picker'}
+    if not triggered_ids & selection_ids:
+        zoom_range = parse_zoom_range(relayout_data)
+        if zoom_range is not None:
+            start_time = max(start_time, zoom_range[0])
+            end_time = min(end_time, zoom_range[1])
+    main_graph = MAIN_GRAPH.snapshot
+    fiat_rates = FIAT_RATES.snapshot
+    # Dataset versions are part of the key, so refreshed data never hits
+    # figures built from the previous snapshot
+    # Like px.line, a list selection gets a legend even with one asset
+    legend_title = None if isinstance(crypto_dropdown, str) else 'variable'
+    cache_key = (
+        cryptos,
+        legend_title,
+        base_currency,
+        start_time,
+        end_time,
+        main_graph.version,
+        fiat_rates.version,
     )
-    fig = px.line(
-        df,
-        x='date',
-        y=crypto_dropdown,
-        labels={
-            "bitcoin": "Price",
-            "value": "Price",
-            "date": "Date"
-        }
+    return MAIN_FIGURE_CACHE.get_or_create(
+        cache_key,
+        lambda: render_main_crypto_series(
+            main_graph.value,
+            cryptos,
+            fiat_rates.value[base_currency],
+            start_time,
+            end_time,
+            legend_title,
+            uirevision=f'{cryptos}-{start_date}-{end_date}'
+        )
     )
-    fig.layout.plot_bgcolor = COLORS['background']
-    fig.layout.paper_bgcolor = COLORS['background']
-    fig.update_xaxes(showgrid=False, zeroline=False)
-    fig.update_yaxes(showgrid=False, zeroline=False)
-    return fig
 
 
-@app.callback(
+def selected_cryptos(crypto_dropdown: Any) -> Tuple[str, ...]:
+    if isinstance(crypto_dropdown, str):
+        return (crypto_dropdown,)
+    return tuple(crypto_dropdown or ())
+
+
+def stream_start(
+    fig: FigureDict,
+    crypto_dropdown: Any,
+    base_currency: str
+) -> Optional[Dict[str, Any]]:
+    # The streamed ticks of each trace start after its last point. Every
+    # render gets a new id, since the figure sent to the browser no longer
+    # holds the ticks streamed into the previous one.
+    if not (fig['data'] and MAIN_GRAPH.is_ready):
+        return None
+    # Same traces, in the same order, as render_main_crypto_series
+    cryptos = [
+        crypto for crypto in selected_cryptos(crypto_dropdown)
+        if crypto in MAIN_GRAPH.get().columns
+    ]
+    if len(cryptos) != len(fig['data']):
+        return None
+    return {
+        'render': uuid.uuid4().hex,
+        'cryptos': cryptos,
+        'currency': base_currency,
+        'since': [
+            pd.Timestamp(trace['x'][-1]).value // 10**6 if len(trace['x']) else 0
+            for trace in fig['data']
+        ],
+    }
+
+
+def parse_zoom_range(
+    relayout_data: Dict[str, Any]
+) -> Optional[Tuple[dt.datetime, dt.datetime]]:
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data:
+        bounds = [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+    elif 'xaxis.range' in relayout_data:
+        bounds = relayout_data['xaxis.range']
+    else:
+        return None
+    start, end = (pd.Timestamp(bound).to_pydatetime() for bound in bounds)
+    return start, end
+
+
+def render_main_crypto_series(
+    main_graph: TimeSeries,
+    cryptos: Tuple[str, ...],
+    fiat_curr_rate: float,
+    start_time: dt.datetime,
+    end_time: dt.datetime,
+    legend_title: Optional[str],
+    uirevision: str
+) -> FigureDict:
+    cryptos = tuple(c for c in cryptos if c in main_graph.columns)
+    df_sampled = downsample_price_data(
+        main_graph.between(start_time, end_time),
+        cryptos,
+        MAIN_GRAPH_MAX_POINTS
+    )
+    variables = df_sampled['variable'].to_numpy()
+    timestamps = df_sampled['timestamp'].to_numpy()
+    values = round_significant(
+        df_sampled['value'].to_numpy() * fiat_curr_rate, PRICE_DIGITS
+    )
+    series = []
+    for crypto in cryptos:
+        selected = variables == crypto
+        series.append((crypto, timestamps[selected], values[selected]))
+    return line_figure(
+        series,
+        x_label='Date',
+        y_label='Price',
+        legend_title=legend_title,
+        uirevision=uirevision
+    )
+
+
+if STREAM_PRICES:
+    @app.callback(
+        [
+            Output('crypto-graph', 'extendData'),
+            Output('price-stream-cursor', 'data')
+        ],
+        Input('price-stream-poll', 'n_intervals'),
+        [
+            State('end-date-picker', 'date'),
+            State('price-stream-start', 'data'),
+            State('price-stream-cursor', 'data')
+        ]
+    )
+    def extend_main_crypto_series(
+        _: int,
+        end_date: str,
+        start: Optional[Dict[str, Any]],
+        cursor: Optional[Dict[str, Any]]
+    ) -> Tuple[Any, Dict[str, Any]]:
+        # Only the ticks newer than the last one sent are appended. The
+        # cursor keeps that tick time per trace, so it holds whichever
+        # worker serves the next poll, and starts over from the stream
+        # start whenever the figure is rendered again.
+        if start is None or not FIAT_RATES.is_ready:
+            raise PreventUpdate
+        if parser.isoparse(end_date).date() < dt.date.today():
+            raise PreventUpdate
+        if cursor is None or cursor['render'] != start['render']:
+            cursor = start
+        fiat_curr_rate = FIAT_RATES.get()[start['currency']]
+        since = list(cursor['since'])
+        extend_data = {'x': [], 'y': []}
+        trace_indices = []
+        for index, crypto in enumerate(start['cryptos']):
+            buffer = PRICE_STREAM.buffer(crypto)
+            if buffer is None:
+                continue
+            times, values = buffer.after(since[index])
+            if len(times):
+                since[index] = int(times[-1])
+                extend_data['x'].append(times.astype('datetime64[ms]'))
+                extend_data['y'].append(
+                    round_significant(values * fiat_curr_rate, PRICE_DIGITS)
+                )
+                trace_indices.append(index)
+        if not trace_indices:
+            raise PreventUpdate
+        max_points = MAIN_GRAPH_MAX_POINTS + PRICE_STREAM_MAX_POINTS
+        cursor = {'render': start['render'], 'since': since}
+        return (extend_data, trace_indices, max_points), cursor
+
+
+@server_callback(
     [
         Output('LED-display-usd', 'value'),
         Output('LED-display-pln', 'value'),
@@ -88,13 +315,20 @@ def display_main_crypto_series(
         Output('alert', 'color'),
         Output('alert', 'is_open')
     ],
-    [Input('base-currency', 'value')]
+    [
+        Input('base-currency', 'value'),
+        Input('data-ready-poll', 'n_intervals')
+    ]
 )
-def display_exchange_rates(base_currency: str) -> Tuple[Any]:
-    fiat_curr_rate = FIAT_CURRENCY_RATES[base_currency]
+def display_exchange_rates(base_currency: str, _: int) -> Tuple[Any]:
+    if not FIAT_RATES.is_ready:
+        no_rates = (None,) * 5
+        return (*no_rates, "Loading exchange rates...", "warning", True)
+    fiat_currency_rates = FIAT_RATES.get()
+    fiat_curr_rate = fiat_currency_rates[base_currency]
     updated_rates = {
         label: round((value / fiat_curr_rate), 2)
-        for label, value in FIAT_CURRENCY_RATES.items()
+        for label, value in fiat_currency_rates.items()
     }
     usd_rate = updated_rates['USD']
     pln_rate = updated_rates['PLN']
@@ -107,76 +341,58 @@ def display_exchange_rates(base_currency: str) -> Tuple[Any]:
     return usd_rate, pln_rate, eur_rate, gbp_rate, chf_rate, alert_message, color, is_open
 
 
-@app.callback(
+@server_callback(
     Output('table-header', 'children'),
     [Input('base-currency', 'value')]
 )
 def display_ranking_table_header(base_currency: str) -> str:
-    return f'Ranking of 10 ten most popular cryptocurrencies in {base_currency}:'
+    return f'Ranking of cryptocurrencies by market cap in {base_currency}:'
 
 
+# Served by the server in both modes: the table only ever holds the visible
+# page of the ranking, which is sorted and filtered here
 @app.callback(
     [
         Output('crypto-table', 'columns'),
-        Output('crypto-table', 'data')
+        Output('crypto-table', 'data'),
+        Output('crypto-table', 'page_count'),
+        Output('crypto-table', 'sort_by')
     ],
-    [Input('base-currency', 'value')]
+    [
+        Input('base-currency', 'value'),
+        Input('crypto-table', 'page_current'),
+        Input('crypto-table', 'page_size'),
+        Input('crypto-table', 'sort_by'),
+        Input('crypto-table', 'filter_query'),
+        Input('data-ready-poll', 'n_intervals')
+    ]
 )
-def display_ranking_table_body(base_currency: str) -> Tuple[ListOfDicts]:
-    curr_symbol = CURRENCY_SYMBOLS[base_currency]
-    fiat_curr_rate = FIAT_CURRENCY_RATES[base_currency]
-    df_cleaned = (
-        DF_CRYPTO_ASSETS
-        .assign(
-            priceUsd=lambda x: x['priceUsd'] * fiat_curr_rate,
-            marketCapUsd=lambda x: x['marketCapUsd'] * fiat_curr_rate,
-            Logo=lambda x: (
-                '[![Coin](https://cryptologos.cc/logos/' +
-                x["id"] + "-" + x["symbol"].str.lower() +
-                '-logo.svg?v=023#thumbnail)](https://cryptologos.cc/)'
-            ),
-        )
-        .round({
-            'priceUsd': 4,
-            'supply': 2,
-            'marketCapUsd': 2,
-            'changePercent24Hr': 2,
-        })
-        .rename(columns={
-            'rank': 'Pos',
-            'name': 'Crypto Name',
-            'symbol': 'Symbol',
-            'priceUsd': f'Price[{curr_symbol}]',
-            'marketCapUsd': f'MarketCap[{curr_symbol}]',
-            'supply': 'Supply',
-            'changePercent24Hr': "Change24h[%]",
-        })
-        .reindex(columns=[
-            'Pos', 'Logo', 'Crypto Name', 'Symbol',
-            f'Price[{curr_symbol}]', 'Supply',
-            f'MarketCap[{curr_symbol}]', 'Change24h[%]'
-        ])
+def display_ranking_table_body(
+    base_currency: str,
+    page_current: int,
+    page_size: int,
+    sort_by: ListOfDicts,
+    filter_query: str,
+    _: int
+) -> Tuple[ListOfDicts, ListOfDicts, int, Any]:
+    if not (ASSETS.is_ready and FIAT_RATES.is_ready):
+        return [], [], 1, dash.no_update
+    table = get_ranking_table()
+    columns, records, page_count = table.page(
+        base_currency,
+        page_current or 0,
+        page_size or RANKING_PAGE_SIZE,
+        sort_by,
+        filter_query
     )
-    data = df_cleaned.to_dict('records')
-    columns = []
-    for col_name in df_cleaned.columns.to_list():
-        if col_name == 'Logo':
-            columns.append({
-                'id': col_name,
-                'name': col_name,
-                'presentation': 'markdown',
-            })
-        else:
-            columns.append({
-                'id': col_name,
-                'name': col_name,
-            })
-    return (columns, data)
+    # The sorted column is renamed along with the currency
+    localized = table.localize_sort_by(sort_by, base_currency)
+    if localized == (sort_by or []):
+        localized = dash.no_update
+    return columns, records, page_count, localized
 
 
 ##### Fear and greed index section #####
-df_fng = get_fear_greed_data()
-
 
 @app.callback(
     Output("fng-collapse", "is_open"),
@@ -189,70 +405,47 @@ def fng_toggle_collapse(n, is_open):
     return is_open
 
 
-@app.callback(
+@server_callback(
     Output("fng-line-graph", "figure"),
-    Input("fng-checklist", "value")
+    [
+        Input("fng-checklist", "value"),
+        Input('data-ready-poll', 'n_intervals')
+    ]
 )
-def display_fng_series(time_range: str) -> Figure:
-    if time_range == "Last Week":
-        df_cut = df_fng[:6]
-    elif time_range == "Last Month":
-        df_cut = df_fng[:29]
-    elif time_range == "Last Six Month":
-        df_cut = df_fng[:179]
-    else:
-        df_cut = df_fng
-    fig = px.line(
-        df_cut,
-        x='timestamp',
-        y='value',
-        labels={
-            "value": "FNG value",
-            "timestamp": "Date"
-        }
+def display_fng_series(time_range: str, _: int) -> FigureDict:
+    if not FNG.is_ready:
+        return placeholder_figure('Loading Fear and Greed Index...')
+    df_cut = FNG.get().last(time_range)
+    return line_figure(
+        [('', df_cut['timestamp'].to_numpy(), df_cut['value'].to_numpy())],
+        x_label='Date',
+        y_label='FNG value',
+        legend_title=None
     )
-    fig.layout.plot_bgcolor = COLORS['background']
-    fig.layout.paper_bgcolor = COLORS['background']
-    fig.update_xaxes(showgrid=False, zeroline=False)
-    fig.update_yaxes(showgrid=False, zeroline=False)
-    return fig
 
 
 ###### RSI indicator section #######
-df_rsi = get_rsi_data()
-
 
-@app.callback(
+@server_callback(
     Output("rsi-line-graph", "figure"),
-    Input("rsi-checklist", "value")
+    [
+        Input("rsi-asset", "value"),
+        Input("rsi-checklist", "value"),
+        Input('data-ready-poll', 'n_intervals')
+    ]
 )
-def display_rsi_series(time_range: str) -> Figure:
-    if time_range == "Last Day":
-        df_cut = df_rsi[:25]
-    elif time_range == "Last Week":
-        df_cut = df_rsi[:169]
-    elif time_range == "Last Two Weeks":
-        df_cut = df_rsi[:337]
-    else:
-        df_cut = df_rsi
-    fig = px.scatter(
-        df_cut,
-        x="timestamp",
-        y="value",
-        color="value",
-        color_continuous_scale=["red", "yellow", "green"],
-        title="RSI Index for X:BTC-USD indicator",
-        labels={
-            "value": "RSI value",
-            "timestamp": "Date"
-        }
+def display_rsi_series(asset: str, time_range: str, _: int) -> FigureDict:
+    if not HOURLY_PRICES.is_ready:
+        return placeholder_figure('Loading RSI data...')
+    df_cut = get_rsi(asset, RSI_WINDOW).last(time_range)
+    return colored_line_figure(
+        df_cut['timestamp'].to_numpy(),
+        df_cut['value'].to_numpy(),
+        x_label='Date',
+        y_label='RSI value',
+        colorscale=['red', 'yellow', 'green'],
+        title=f'RSI Index for {asset}-USD indicator'
     )
-    fig.layout.plot_bgcolor = COLORS['background']
-    fig.layout.paper_bgcolor = COLORS['background']
-    fig.update_traces(mode='markers+lines')
-    fig.update_xaxes(showgrid=False, zeroline=False)
-    fig.update_yaxes(showgrid=False, zeroline=False)
-    return fig
 
 
 @app.callback(
@@ -267,54 +460,48 @@ def rsi_toggle_collapse(n, is_open):
 
 
 ###### MA-50 and Ma-200 indicator section #######
-df_ma50, df_ma200 = clean_ma_data(
-    ma_windows=['50', '180'],
-    ma_types=['sma', 'ema'],
-)
-
 
-@app.callback(
+@server_callback(
     Output('ma-line-graph', 'figure'),
     [
+        Input('ma-asset', 'value'),
         Input('ma-types', 'value'),
         Input('ma-window', 'value'),
-        Input('ma-period', 'value')
+        Input('ma-period', 'value'),
+        Input('data-ready-poll', 'n_intervals')
     ]
 )
-def display_ma_series(types: str, window: str, period: str) -> Figure:
-    if window == "50 days":
-        df_ma = df_ma50
-    else:
-        df_ma = df_ma200
-    if period == "Last Day":
-        df_ma_cut = df_ma[:25]
-    elif period == "Last Week":
-        df_ma_cut = df_ma[:169]
-    elif period == "Last Two Weeks":
-        df_ma_cut = df_ma[:337]
-    else:
-        df_ma_cut = df_ma
+def display_ma_series(
+    asset: str,
+    types: str,
+    window: str,
+    period: str,
+    _: int
+) -> FigureDict:
+    if not MAIN_GRAPH.is_ready:
+        return placeholder_figure('Loading moving averages...')
+    # The window dropdown is clearable, and a cleared one shows 200 days
+    df_ma_cut = get_moving_averages(asset, MA_WINDOWS.get(window, 200)).last(period)
     ma_types = []
     if "  Simple Moving Average (SMA)" in types:
         ma_types.append('SMA')
     if "  Exponential Moving Average (EMA)" in types:
         ma_types.append('EMA')
-    ma_types.append('BTC price')
-    fig = px.line(
-        df_ma_cut,
-        x='timestamp',
-        y=ma_types,
-        title="Moving Averages Index for X:BTC-USD indicator",
-        labels={
-            "value": "BTC Price",
-            "timestamp": "Date"
-        }
+    ma_types.append('Price')
+    timestamps = df_ma_cut['timestamp'].to_numpy()
+    return line_figure(
+        [
+            (
+                ma_type,
+                timestamps,
+                round_significant(df_ma_cut[ma_type].to_numpy(), PRICE_DIGITS)
+            )
+            for ma_type in ma_types
+        ],
+        x_label='Date',
+        y_label='Price',
+        title=f'Moving Averages Index for {asset}-USD indicator'
     )
-    fig.layout.plot_bgcolor = COLORS['background']
-    fig.layout.paper_bgcolor = COLORS['background']
-    fig.update_xaxes(showgrid=False, zeroline=False)
-    fig.update_yaxes(showgrid=False, zeroline=False)
-    return fig
 
 
 @app.callback(
@@ -328,7 +515,253 @@ def ma_toggle_collapse(n, is_open):
     return is_open
 
 
-app.layout = render_layout(CRYPTO_ASSET_NAMES, df_fng)
+##### Clientside mode #####
+
+def is_current(store: Optional[Dict[str, Any]], version: int) -> bool:
+    # Periodic refreshes only resend a store when its dataset has changed
+    triggered_ids = {
+        trigger['prop_id'].split('.')[0]
+        for trigger in dash.callback_context.triggered
+    }
+    return (
+        triggered_ids == {'data-refresh-poll'} and
+        store is not None and
+        store.get('version') == version
+    )
+
+
+if CLIENTSIDE_CALLBACKS:
+    TIME_RANGES_MS = {
+        name: time_range.total_seconds() * 1000
+        for name, time_range in NAMED_TIME_RANGES.items()
+    }
+
+    @app.callback(
+        Output('fiat-rates-store', 'data'),
+        [
+            Input('data-ready-poll', 'n_intervals'),
+            Input('data-refresh-poll', 'n_intervals')
+        ],
+        State('fiat-rates-store', 'data')
+    )
+    def store_fiat_rates(_: int, __: int, store: Dict[str, Any]) -> Dict[str, Any]:
+        snapshot = FIAT_RATES.snapshot
+        if snapshot.version == 0 or is_current(store, snapshot.version):
+            raise PreventUpdate
+        return {
+            'version': snapshot.version,
+            'rates': snapshot.value,
+            'symbols': CURRENCY_SYMBOLS,
+        }
+
+    @app.callback(
+        Output('crypto-graph-usd', 'data'),
+        [
+            Input('crypto-dropdown', 'value'),
+            Input('start-date-picker', 'date'),
+            Input('end-date-picker', 'date'),
+            Input('crypto-graph', 'relayoutData'),
+            Input('data-ready-poll', 'n_intervals'),
+            Input('data-refresh-poll', 'n_intervals')
+        ],
+        State('crypto-graph-usd', 'data')
+    )
+    def store_main_crypto_series(
+        crypto_dropdown: str,
+        start_date: str,
+        end_date: str,
+        relayout_data: Dict[str, Any],
+        poll: int,
+        _: int,
+        store: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        version = MAIN_GRAPH.version
+        if is_current(store, version):
+            raise PreventUpdate
+        fig = main_crypto_figure(
+            crypto_dropdown, 'USD', start_date, end_date, relayout_data
+        )
+        store = {'version': version, 'figure': fig}
+        if STREAM_PRICES:
+            # The browser sets the render id and currency on each conversion
+            store['streamStart'] = stream_start(fig, crypto_dropdown, 'USD')
+        return store
+
+    convert_figure = 'convertStreamingFigure' if STREAM_PRICES else 'convertFigure'
+    app.clientside_callback(
+        ClientsideFunction(namespace='crypto', function_name=convert_figure),
+        MAIN_GRAPH_OUTPUT,
+        [
+            Input('crypto-graph-usd', 'data'),
+            Input('base-currency', 'value'),
+            Input('fiat-rates-store', 'data')
+        ]
+    )
+    app.clientside_callback(
+        ClientsideFunction(
+            namespace='crypto', function_name='displayExchangeRates'
+        ),
+        [
+            Output('LED-display-usd', 'value'),
+            Output('LED-display-pln', 'value'),
+            Output('LED-display-eur', 'value'),
+            Output('LED-display-gpb', 'value'),
+            Output('LED-display-chf', 'value'),
+            Output('alert', 'children'),
+            Output('alert', 'color'),
+            Output('alert', 'is_open')
+        ],
+        [
+            Input('base-currency', 'value'),
+            Input('fiat-rates-store', 'data')
+        ]
+    )
+    app.clientside_callback(
+        ClientsideFunction(
+            namespace='crypto', function_name='displayRankingTableHeader'
+        ),
+        Output('table-header', 'children'),
+        Input('base-currency', 'value')
+    )
+
+    # The FNG, RSI and MA stores hold the whole series, and the time range
+    # presets are applied in the browser
+    @app.callback(
+        Output('fng-figure-store', 'data'),
+        [
+            Input('data-ready-poll', 'n_intervals'),
+            Input('data-refresh-poll', 'n_intervals')
+        ],
+        State('fng-figure-store', 'data')
+    )
+    def store_fng_series(poll: int, _: int, store: Dict[str, Any]) -> Dict[str, Any]:
+        version = FNG.version
+        if is_current(store, version):
+            raise PreventUpdate
+        fig = display_fng_series(None, poll)
+        return {'version': version, 'figure': fig, 'ranges': TIME_RANGES_MS}
+
+    @app.callback(
+        Output('rsi-figure-store', 'data'),
+        [
+            Input('rsi-asset', 'value'),
+            Input('data-ready-poll', 'n_intervals'),
+            Input('data-refresh-poll', 'n_intervals')
+        ],
+        State('rsi-figure-store', 'data')
+    )
+    def store_rsi_series(
+        asset: str,
+        poll: int,
+        _: int,
+        store: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        version = HOURLY_PRICES.version
+        if is_current(store, version):
+            raise PreventUpdate
+        fig = display_rsi_series(asset, None, poll)
+        return {'version': version, 'figure': fig, 'ranges': TIME_RANGES_MS}
+
+    @app.callback(
+        Output('ma-figure-store', 'data'),
+        [
+            Input('ma-asset', 'value'),
+            Input('ma-types', 'value'),
+            Input('ma-window', 'value'),
+            Input('data-ready-poll', 'n_intervals'),
+            Input('data-refresh-poll', 'n_intervals')
+        ],
+        State('ma-figure-store', 'data')
+    )
+    def store_ma_series(
+        asset: str,
+        types: str,
+        window: str,
+        poll: int,
+        _: int,
+        store: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        version = MAIN_GRAPH.version
+        if is_current(store, version):
+            raise PreventUpdate
+        fig = display_ma_series(asset, types, window, None, poll)
+        return {'version': version, 'figure': fig, 'ranges': TIME_RANGES_MS}
+
+    for graph_id, selector_id, store_id in [
+        ('fng-line-graph', 'fng-checklist', 'fng-figure-store'),
+        ('rsi-line-graph', 'rsi-checklist', 'rsi-figure-store'),
+        ('ma-line-graph', 'ma-period', 'ma-figure-store'),
+    ]:
+        app.clientside_callback(
+            ClientsideFunction(
+                namespace='crypto', function_name='filterTimeRange'
+            ),
+            Output(graph_id, 'figure'),
+            [
+                Input(selector_id, 'value'),
+                Input(store_id, 'data')
+            ]
+        )
+
+
+def serve_layout() -> html.Div:
+    return render_layout(
+        SCHEDULER.is_ready,
+        clientside=CLIENTSIDE_CALLBACKS,
+        stream=STREAM_PRICES
+    )
+
+
+app.layout = serve_layout
+instrument_callbacks(app.callback_map)
 server = app.server
+
+
+@server.route('/healthz')
+def healthz() -> Response:
+    return jsonify({'status': 'ok'})
+
+
+@server.route('/stats/cache')
+def cache_stats() -> Response:
+    return jsonify({
+        MAIN_FIGURE_CACHE.name: MAIN_FIGURE_CACHE.stats(),
+        rates_cache.name: rates_cache.stats(),
+    })
+
+
+@server.route('/readyz')
+def readyz() -> Tuple[Response, int]:
+    datasets = {
+        dataset.name: dataset.status()
+        for dataset in SCHEDULER.datasets
+    }
+    # Orphaned shared datasets mean the publisher stopped, and this worker
+    # would never see new data. Old data alone does not fail the check: it
+    # only means the upstream is down, which every worker shares.
+    ready = SCHEDULER.is_ready and not SCHEDULER.is_orphaned
+    status_code = 200 if ready else 503
+    return jsonify({'ready': ready, 'datasets': datasets}), status_code
+
+
+@server.route('/metrics')
+def metrics() -> Response:
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@server.route('/debug/profile', methods=['GET', 'POST'])
+def profile_callback() -> Response:
+    # POST /debug/profile?callback=<name>&calls=<n> samples the next n calls
+    # of one callback; GET returns the collapsed stacks sampled so far
+    if not PROFILER_ENABLED:
+        abort(404)
+    if request.method == 'POST':
+        callback = request.args.get('callback', '')
+        calls = request.args.get('calls', 1, type=int)
+        PROFILER.arm(callback, calls)
+        return jsonify({'callback': callback, 'calls': calls})
+    return Response(PROFILER.collapsed(), mimetype='text/plain')
+
+
 if __name__ == '__main__':
     app.run_server()
@@ -0,0 +1,106 @@
+// Clientside callbacks, registered when CLIENTSIDE_CALLBACKS=1. The server
+// sends USD data and the rate vector once, through dcc.Store components,
+// and these functions derive everything that depends only on the base
+// currency or on a time range preset.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    crypto: {
+        convertFigure: function(store, baseCurrency, ratesStore) {
+            if (!store) {
+                return window.dash_clientside.no_update;
+            }
+            if (!ratesStore || !ratesStore.rates) {
+                return store.figure;
+            }
+            const rate = ratesStore.rates[baseCurrency];
+            const data = store.figure.data.map(function(trace) {
+                if (!Array.isArray(trace.y)) {
+                    return trace;
+                }
+                return Object.assign({}, trace, {
+                    y: trace.y.map(function(value) {
+                        return value === null ? null : value * rate;
+                    })
+                });
+            });
+            return Object.assign({}, store.figure, {data: data});
+        },
+
+        convertStreamingFigure: function(store, baseCurrency, ratesStore) {
+            // Also outputs where the price stream picks up; a new render id
+            // makes the server start the stream over for the new figure
+            if (!store) {
+                return [window.dash_clientside.no_update,
+                        window.dash_clientside.no_update];
+            }
+            const figure = window.dash_clientside.crypto.convertFigure(
+                store, baseCurrency, ratesStore
+            );
+            if (!store.streamStart) {
+                return [figure, null];
+            }
+            const start = Object.assign({}, store.streamStart, {
+                render: Date.now().toString(36) + Math.random().toString(36).slice(2),
+                currency: baseCurrency
+            });
+            return [figure, start];
+        },
+
+        displayExchangeRates: function(baseCurrency, ratesStore) {
+            if (!ratesStore || !ratesStore.rates) {
+                return [null, null, null, null, null,
+                        'Loading exchange rates...', 'warning', true];
+            }
+            const rates = ratesStore.rates;
+            const baseRate = rates[baseCurrency];
+            const led = ['USD', 'PLN', 'EUR', 'GBP', 'CHF'].map(function(label) {
+                return Math.round(rates[label] / baseRate * 100) / 100;
+            });
+            return led.concat(['Everything ok', 'info', false]);
+        },
+
+        displayRankingTableHeader: function(baseCurrency) {
+            return 'Ranking of cryptocurrencies by market cap in ' +
+                baseCurrency + ':';
+        },
+
+        filterTimeRange: function(timeRange, store) {
+            // Keeps the points within the named range before the newest one
+            if (!store) {
+                return window.dash_clientside.no_update;
+            }
+            const span = store.ranges[timeRange];
+            if (span === undefined) {
+                return store.figure;
+            }
+            let latest = -Infinity;
+            store.figure.data.forEach(function(trace) {
+                (trace.x || []).forEach(function(x) {
+                    latest = Math.max(latest, Date.parse(x));
+                });
+            });
+            const start = latest - span;
+            const data = store.figure.data.map(function(trace) {
+                if (!Array.isArray(trace.x)) {
+                    return trace;
+                }
+                const keep = trace.x.map(function(x) {
+                    return Date.parse(x) >= start;
+                });
+                const pick = function(values) {
+                    return values.filter(function(_, i) { return keep[i]; });
+                };
+                const filtered = Object.assign({}, trace, {
+                    x: pick(trace.x),
+                    y: pick(trace.y)
+                });
+                if (trace.marker && Array.isArray(trace.marker.color)) {
+                    filtered.marker = Object.assign({}, trace.marker, {
+                        color: pick(trace.marker.color)
+                    });
+                }
+                return filtered;
+            });
+            return Object.assign({}, store.figure, {data: data});
+        }
+    }
+});
@@ -0,0 +1,48 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+
+def load_results(path: Path) -> Dict[str, Dict[str, Any]]:
+    return json.loads(path.read_text())['results']
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Compares two benchmark result files'
+    )
+    parser.add_argument('baseline', type=Path)
+    parser.add_argument('candidate', type=Path)
+    parser.add_argument('--metric', default='p50_ms')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='relative slowdown reported as a regression (default 0.1)'
+    )
+    args = parser.parse_args()
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+
+    regressions = []
+    print(f"{'benchmark':<60} {'baseline':>11} {'candidate':>11} {'change':>8}")
+    for name in sorted(baseline.keys() | candidate.keys()):
+        if name not in baseline or name not in candidate:
+            side = 'baseline' if name in baseline else 'candidate'
+            print(f'{name:<60} only in {side}')
+            continue
+        before = baseline[name][args.metric]
+        after = candidate[name][args.metric]
+        change = (after - before) / before if before else 0.0
+        marker = ''
+        if change > args.threshold:
+            marker = ' !'
+            regressions.append(name)
+        print(f'{name:<60} {before:>11.2f} {after:>11.2f} {change:>+8.1%}{marker}')
+    if regressions:
+        print(f'{len(regressions)} regression(s) above {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
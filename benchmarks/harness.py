@@ -0,0 +1,163 @@
+import datetime as dt
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from standin_server import StandinServer, start_standin_server
+
+
+PropId = Tuple[str, str]
+# Component values for each data size, on top of the layout defaults
+SIZES: Dict[str, Dict[PropId, Any]] = {
+    'small': {
+        ('crypto-dropdown', 'value'): ['bitcoin'],
+        ('start-date-picker', 'date'): 365,
+        ('fng-checklist', 'value'): 'Last Week',
+        ('rsi-checklist', 'value'): 'Last Day',
+        ('ma-period', 'value'): 'Last Month',
+    },
+    'medium': {
+        ('crypto-dropdown', 'value'): ['bitcoin', 'ethereum', 'tether'],
+        ('start-date-picker', 'date'): 5 * 365,
+        ('fng-checklist', 'value'): 'Last Six Months',
+        ('rsi-checklist', 'value'): 'Last Two Weeks',
+        ('ma-period', 'value'): 'Last Six Months',
+    },
+    'large': {
+        ('crypto-dropdown', 'value'): 10,
+        ('start-date-picker', 'date'): None,
+        ('fng-checklist', 'value'): 'Last Year',
+        ('rsi-checklist', 'value'): 'Last Month',
+        ('ma-period', 'value'): 'Last Year',
+    },
+}
+
+
+def start_offline_environment(
+    workdir: Path,
+    fixtures_dir: Optional[Path] = None,
+    **standin_options: Any
+) -> StandinServer:
+    # Has to run before app, models or constants are imported: the SQLite
+    # cache is created in the working directory and the base URLs are read
+    # from the environment at import time
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)
+    server = start_standin_server(fixtures_dir=fixtures_dir, **standin_options)
+    os.environ['COINCAP_BASE_URL'] = server.base_url
+    os.environ['FNG_BASE_URL'] = server.base_url
+    return server
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples) * 1000  # In miliseconds
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()),
+        'min_ms': float(values.min()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p90_ms': float(np.percentile(values, 90)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def walk_layout(component: Any) -> Iterator[Any]:
+    yield component
+    children = getattr(component, 'children', None)
+    if children is None or isinstance(children, (str, int, float)):
+        return
+    if not isinstance(children, (list, tuple)):
+        children = [children]
+    for child in children:
+        yield from walk_layout(child)
+
+
+def layout_values(layout: Any) -> Dict[PropId, Any]:
+    # The initial value of every property of every component with an id
+    values = {}
+    for component in walk_layout(layout):
+        component_id = getattr(component, 'id', None)
+        if component_id is None:
+            continue
+        for prop in component._prop_names:
+            values[(component_id, prop)] = getattr(component, prop, None)
+    return values
+
+
+def size_values(
+    size: str,
+    asset_names: List[str],
+    today: Optional[dt.date] = None
+) -> Dict[PropId, Any]:
+    today = today or dt.date.today()
+    values = dict(SIZES[size])
+    cryptos = values[('crypto-dropdown', 'value')]
+    if isinstance(cryptos, int):
+        values[('crypto-dropdown', 'value')] = asset_names[:cryptos]
+    days = values[('start-date-picker', 'date')]
+    start = dt.date(2015, 1, 1) if days is None else today - dt.timedelta(days=days)
+    values[('start-date-picker', 'date')] = start.isoformat()
+    values[('end-date-picker', 'date')] = today.isoformat()
+    return values
+
+
+def parse_outputs(output: str) -> List[Dict[str, str]]:
+    # Multi-output keys look like '..a.prop...b.prop..'
+    outputs = []
+    for part in output.strip('.').split('...'):
+        component_id, prop = part.rsplit('.', 1)
+        outputs.append({'id': component_id, 'property': prop})
+    return outputs
+
+
+def callback_payload(
+    output: str,
+    callback: Dict[str, Any],
+    values: Dict[PropId, Any],
+    changed: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    # The request body dash-renderer posts to /_dash-update-component
+    outputs = parse_outputs(output)
+
+    def props(dependencies: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'id': dep['id'],
+                'property': dep['property'],
+                'value': values.get((dep['id'], dep['property'])),
+            }
+            for dep in dependencies
+        ]
+
+    inputs = callback['inputs']
+    if changed is None:
+        changed = [f"{inputs[0]['id']}.{inputs[0]['property']}"]
+    return {
+        'output': output,
+        'outputs': outputs if output.startswith('..') else outputs[0],
+        'inputs': props(inputs),
+        'state': props(callback['state']),
+        'changedPropIds': changed,
+    }
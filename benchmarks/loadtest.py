@@ -0,0 +1,324 @@
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from harness import (
+    REPO_ROOT, PropId, callback_payload, git_revision, start_offline_environment,
+    summarize
+)
+
+
+Action = Tuple[str, Dict[PropId, Any]]
+MAX_BACKOFF = 10  # Between sessions after failed page loads, in seconds
+CURRENCIES = ['USD', 'EUR', 'GBP', 'PLN', 'CHF']
+TABS = {  # Graph outputs rendered when a tab is opened
+    'fng': ['fng-line-graph.figure'],
+    'rsi': ['rsi-line-graph.figure'],
+    'ma': ['ma-line-graph.figure'],
+}
+TIME_RANGES = {
+    'fng-checklist': ['Last Week', 'Last Month', 'Last Six Months', 'Last Year'],
+    'rsi-checklist': ['Last Day', 'Last Week', 'Last Two Weeks', 'Last Month'],
+    'ma-period': ['Last Month', 'Last Three Months', 'Last Six Months', 'Last Year'],
+}
+
+
+def walk_layout(node: Any) -> Dict[PropId, Any]:
+    # Collects the initial props from the /_dash-layout JSON
+    values = {}
+    if isinstance(node, list):
+        for child in node:
+            values.update(walk_layout(child))
+    elif isinstance(node, dict) and 'props' in node:
+        props = node['props']
+        if 'id' in props:
+            for prop, value in props.items():
+                values[(props['id'], prop)] = value
+        values.update(walk_layout(props.get('children')))
+    return values
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, name: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies[name].append(latency)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        all_latencies = []
+        for name, latencies in sorted(self.latencies.items()):
+            all_latencies.extend(latencies)
+            report[name] = {
+                **summarize(latencies),
+                'throughput_rps': len(latencies) / elapsed,
+                'error_rate': self.errors[name] / len(latencies),
+            }
+        if all_latencies:
+            report['total'] = {
+                **summarize(all_latencies),
+                'throughput_rps': len(all_latencies) / elapsed,
+                'error_rate': sum(self.errors.values()) / len(all_latencies),
+            }
+        return report
+
+
+class UserSession:
+    # One simulated browser: loads the page, then performs random actions,
+    # firing the server callbacks the dash-renderer would fire for each one
+    def __init__(
+        self,
+        base_url: str,
+        dependencies: List[Dict[str, Any]],
+        recorder: Recorder,
+        think_time: float,
+        rng: random.Random
+    ) -> None:
+        self.base_url = base_url
+        self.dependencies = [
+            dep for dep in dependencies if not dep.get('clientside_function')
+        ]
+        self.recorder = recorder
+        self.think_time = think_time
+        self.rng = rng
+        self.http = requests.Session()
+        self.values: Dict[PropId, Any] = {}
+        self.asset_names: List[str] = []
+
+    def request(self, name: str, method: str, path: str, **kwargs: Any) -> Optional[requests.Response]:
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=60, **kwargs)
+            ok = response.status_code in (200, 204)
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.add(name, time.perf_counter() - started, ok)
+        return response
+
+    def fire(self, dependency: Dict[str, Any], changed: List[str]) -> None:
+        payload = callback_payload(
+            dependency['output'], dependency, self.values, changed
+        )
+        name = 'callback ' + dependency['output'].strip('.').split('...')[0]
+        response = self.request(
+            name, 'POST', '/_dash-update-component', json=payload
+        )
+        if response is None or response.status_code != 200:
+            return
+        for component_id, props in response.json().get('response', {}).items():
+            for prop, value in props.items():
+                self.values[(component_id, prop)] = value
+                if (component_id, prop) == ('crypto-dropdown', 'options') and value:
+                    self.asset_names = [
+                        option if isinstance(option, str) else option['value']
+                        for option in value
+                    ]
+
+    def load_page(self) -> bool:
+        response = self.request('page /_dash-layout', 'GET', '/_dash-layout')
+        if response is None or response.status_code != 200:
+            return False
+        self.values = walk_layout(response.json())
+        self.values[('data-ready-poll', 'n_intervals')] = 1
+        # On page load the renderer fires every callback that is not
+        # prevented from its initial call
+        for dependency in self.dependencies:
+            if not dependency.get('prevent_initial_call'):
+                self.fire(dependency, [])
+        return True
+
+    def choose_action(self) -> Action:
+        assets = self.asset_names or ['bitcoin']
+        today = dt.date.today()
+        kind = self.rng.choices(
+            ['currency', 'cryptos', 'dates', 'tab', 'time range', 'asset'],
+            weights=[3, 3, 2, 2, 3, 2],
+        )[0]
+        if kind == 'currency':
+            return kind, {('base-currency', 'value'): self.rng.choice(CURRENCIES)}
+        if kind == 'cryptos':
+            cryptos = self.rng.sample(assets, self.rng.randint(1, min(4, len(assets))))
+            return kind, {('crypto-dropdown', 'value'): cryptos}
+        if kind == 'dates':
+            years = self.rng.randint(1, 8)
+            start = today - dt.timedelta(days=365 * years)
+            return kind, {('start-date-picker', 'date'): start.isoformat()}
+        if kind == 'tab':
+            return kind, {('tab', 'outputs'): self.rng.choice(list(TABS))}
+        if kind == 'time range':
+            component_id = self.rng.choice(list(TIME_RANGES))
+            return kind, {(component_id, 'value'): self.rng.choice(TIME_RANGES[component_id])}
+        component_id = self.rng.choice(['rsi-asset', 'ma-asset'])
+        return kind, {(component_id, 'value'): self.rng.choice(assets)}
+
+    def perform(self, changes: Dict[PropId, Any]) -> None:
+        if ('tab', 'outputs') in changes:
+            # Opening a tab mounts its graphs, which fires their callbacks
+            # as initial calls
+            outputs = TABS[changes[('tab', 'outputs')]]
+            for dependency in self.dependencies:
+                if dependency['output'] in outputs:
+                    self.fire(dependency, [])
+            return
+        self.values.update(changes)
+        changed = [f'{component_id}.{prop}' for component_id, prop in changes]
+        for dependency in self.dependencies:
+            inputs = {f"{dep['id']}.{dep['property']}" for dep in dependency['inputs']}
+            if inputs & set(changed):
+                self.fire(dependency, changed)
+
+    def run(self, deadline: float, actions: int) -> bool:
+        # Without a layout there is nothing to interact with, so a failed
+        # page load ends the session
+        if not self.load_page():
+            return False
+        for _ in range(actions):
+            if time.monotonic() >= deadline:
+                return True
+            time.sleep(self.rng.uniform(0, 2 * self.think_time))
+            _, changes = self.choose_action()
+            self.perform(changes)
+        return True
+
+
+def wait_until_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + '/readyz', timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    raise RuntimeError(f'{base_url} was not ready after {timeout}s')
+
+
+def serve_app(workers: int, threads: int, port: int, fixtures: Optional[Path]) -> Tuple[str, subprocess.Popen]:
+    # Starts the stand-in and the app under gunicorn, fully offline
+    workdir = Path(tempfile.mkdtemp(prefix='loadtest-'))
+    standin = start_offline_environment(workdir, fixtures)
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', 'app:server',
+            '--config', str(REPO_ROOT / 'gunicorn.conf.py'),
+            '--pythonpath', str(REPO_ROOT),
+            '--workers', str(workers),
+            '--threads', str(threads),
+            '--bind', f'127.0.0.1:{port}',
+        ],
+        cwd=workdir,
+        env={**os.environ, 'COINCAP_BASE_URL': standin.base_url, 'FNG_BASE_URL': standin.base_url},
+    )
+    return f'http://127.0.0.1:{port}', process
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Replays simulated user sessions against /_dash-update-component'
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='base URL of a running app')
+    target.add_argument('--serve', action='store_true', help='start the app under gunicorn with the stand-in upstream')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers, with --serve')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker, with --serve')
+    parser.add_argument('--port', type=int, default=8050, help='app port, with --serve')
+    parser.add_argument('--fixtures', type=Path, help='fixtures recorded with standin_server.py, with --serve')
+    parser.add_argument('--users', type=int, default=10, help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=60, help='in seconds')
+    parser.add_argument('--actions', type=int, default=50, help='actions per user session')
+    parser.add_argument('--think-time', type=float, default=0.5, help='mean pause between actions, in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='JSON report path')
+    args = parser.parse_args()
+
+    process = None
+    if args.serve:
+        base_url, process = serve_app(args.workers, args.threads, args.port, args.fixtures)
+    else:
+        base_url = args.url.rstrip('/')
+    try:
+        wait_until_ready(base_url, timeout=300)
+        dependencies = requests.get(base_url + '/_dash-dependencies', timeout=30).json()
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        rng = random.Random(args.seed)
+
+        def simulate_user(seed: int) -> None:
+            # Users start a new session when theirs runs out of actions.
+            # After a failed page load they back off first, so a failing
+            # server is not hammered with page loads.
+            backoff = args.think_time
+            while time.monotonic() < deadline:
+                user_rng = random.Random(seed)
+                session = UserSession(
+                    base_url, dependencies, recorder, args.think_time, user_rng
+                )
+                if session.run(deadline, args.actions):
+                    backoff = args.think_time
+                else:
+                    time.sleep(min(
+                        user_rng.uniform(0, 2 * backoff),
+                        max(deadline - time.monotonic(), 0)
+                    ))
+                    backoff = min(backoff * 2, MAX_BACKOFF)
+                seed += args.users
+
+        users = [
+            threading.Thread(target=simulate_user, args=(rng.randrange(2 ** 32),), daemon=True)
+            for _ in range(args.users)
+        ]
+        started = time.monotonic()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.monotonic() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = recorder.report(elapsed)
+    print(f"{'request':<55} {'count':>7} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, stats in report.items():
+        print(
+            f"{name:<55} {stats['count']:>7} {stats['throughput_rps']:>8.2f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} {stats['p99_ms']:>9.1f} "
+            f"{stats['error_rate']:>7.1%}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps({
+            'meta': {
+                'revision': git_revision(),
+                'created_at': dt.datetime.now().isoformat(timespec='seconds'),
+                'url': base_url,
+                'users': args.users,
+                'duration': args.duration,
+                'think_time': args.think_time,
+                'workers': args.workers if args.serve else None,
+                'threads': args.threads if args.serve else None,
+            },
+            'results': report,
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
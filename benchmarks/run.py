@@ -0,0 +1,233 @@
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from harness import (
+    REPO_ROOT, SIZES, callback_payload, git_revision, layout_values,
+    size_values, start_offline_environment, summarize
+)
+
+
+Results = Dict[str, Dict[str, Any]]
+STARTUP_SCRIPT = (
+    'import time; started = time.perf_counter(); import app; ' +
+    'print(time.perf_counter() - started)'
+)
+
+
+def measure(
+    func: Callable[[], Any],
+    repeat: int,
+    setup: Optional[Callable[[], Any]] = None,
+    warmup: int = 1
+) -> Dict[str, Any]:
+    # Timings and peak memory come from separate runs, since tracemalloc
+    # slows down allocation heavy code
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {**summarize(samples), 'peak_memory_bytes': peak}
+
+
+def bench_startup(base_url: str, repeat: int) -> Results:
+    # Each run is a fresh interpreter; "cold" starts with an empty SQLite
+    # cache, "warm" reuses the one filled by the previous run and "lazy"
+    # only measures the import, with the datasets loaded in the background
+    env = {
+        **os.environ,
+        'COINCAP_BASE_URL': base_url,
+        'FNG_BASE_URL': base_url,
+        'PYTHONPATH': str(REPO_ROOT),
+    }
+    results = {}
+    for mode in ['lazy', 'cold', 'warm']:
+        samples = []
+        with tempfile.TemporaryDirectory() as workdir:
+            if mode == 'warm':
+                subprocess.run(
+                    [sys.executable, '-c', STARTUP_SCRIPT],
+                    cwd=workdir, env=env, check=True, capture_output=True
+                )
+            for _ in range(repeat):
+                if mode == 'cold':
+                    for db_file in Path(workdir).glob('*.db*'):
+                        db_file.unlink()
+                output = subprocess.run(
+                    [sys.executable, '-c', STARTUP_SCRIPT],
+                    cwd=workdir,
+                    env={**env, 'LAZY_STARTUP': '1' if mode == 'lazy' else '0'},
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+                samples.append(float(output.stdout.strip().splitlines()[-1]))
+        results[f'startup.{mode}'] = summarize(samples)
+    return results
+
+
+def bench_utils(repeat: int) -> Results:
+    import utils
+    from datasets import FNG, get_asset_names
+    from models import rates_cache
+
+    results = {}
+    asset_names = get_asset_names()
+    now = dt.datetime.now()
+    for size in SIZES:
+        values = size_values(size, asset_names)
+        currencies = values[('crypto-dropdown', 'value')]
+        start = dt.datetime.fromisoformat(values[('start-date-picker', 'date')])
+        results[f'utils.clean_price_data[{size}]'] = measure(
+            lambda: utils.clean_price_data(start, now, currencies), repeat
+        )
+    currency_names = ['USD', 'EUR', 'GBP', 'PLN', 'CHF']
+    results['utils.clean_exchange_rates[memory]'] = measure(
+        lambda: utils.clean_exchange_rates(dt.date.today(), currency_names),
+        repeat
+    )
+    results['utils.clean_exchange_rates[sqlite]'] = measure(
+        lambda: utils.clean_exchange_rates(dt.date.today(), currency_names),
+        repeat,
+        setup=rates_cache.clear
+    )
+    fng_frame = FNG.get().frame
+    results['utils.resample_df_fng'] = measure(
+        lambda: utils.resample_df_fng(fng_frame), repeat
+    )
+    return results
+
+
+def bench_indicators(repeat: int) -> Results:
+    # clean_ma_data and the RSI endpoint were replaced by these functions
+    import indicators
+    from downsampling import lttb_indices
+
+    results = {}
+    rng = np.random.default_rng(0)
+    for points in [1_000, 10_000, 100_000]:
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, points)))
+        x = np.arange(points, dtype='float64')
+        results[f'indicators.wilder_rsi[{points}]'] = measure(
+            lambda: indicators.wilder_rsi(prices, 14), repeat
+        )
+        results[f'indicators.simple_moving_average[{points}]'] = measure(
+            lambda: indicators.simple_moving_average(prices, 200), repeat
+        )
+        results[f'indicators.exponential_moving_average[{points}]'] = measure(
+            lambda: indicators.exponential_moving_average(prices, 200), repeat
+        )
+        results[f'downsampling.lttb_indices[{points}]'] = measure(
+            lambda: lttb_indices(x, prices, 1000), repeat
+        )
+    return results
+
+
+def bench_callbacks(repeat: int) -> Results:
+    # Every server callback is called through /_dash-update-component, so
+    # request parsing and JSON serialization are included. Figure caches
+    # are cleared before each call, so the numbers are cache misses.
+    import app
+    from cache import LRUCache
+    from datasets import get_asset_names
+
+    caches = [
+        value for value in vars(app).values() if isinstance(value, LRUCache)
+    ]
+
+    def clear_caches() -> None:
+        for cache in caches:
+            cache.clear()
+
+    client = app.server.test_client()
+    defaults = layout_values(app.serve_layout())
+    defaults[('data-ready-poll', 'n_intervals')] = 1
+    asset_names = get_asset_names()
+    size_props = set(SIZES['small']) | {('end-date-picker', 'date')}
+    results = {}
+    for output, callback in app.app.callback_map.items():
+        name = callback['callback'].__name__
+        inputs = {(dep['id'], dep['property']) for dep in callback['inputs']}
+        sizes = list(SIZES) if inputs & size_props else ['default']
+        for size in sizes:
+            values = dict(defaults)
+            if size != 'default':
+                values.update(size_values(size, asset_names))
+            payload = callback_payload(output, callback, values)
+
+            def call() -> None:
+                response = client.post('/_dash-update-component', json=payload)
+                if response.status_code not in (200, 204):
+                    raise RuntimeError(f'{name} returned {response.status_code}')
+
+            key = f'callback.{name}' if size == 'default' else f'callback.{name}[{size}]'
+            results[key] = measure(call, repeat, setup=clear_caches)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmarks startup, data cleaning and every Dash callback'
+    )
+    parser.add_argument('--output', type=Path, default=Path('benchmark-results.json'))
+    parser.add_argument('--fixtures', type=Path, help='fixtures recorded with standin_server.py')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--startup-repeat', type=int, default=3)
+    parser.add_argument('--skip-startup', action='store_true')
+    args = parser.parse_args()
+    output = args.output.resolve()
+    fixtures = args.fixtures.resolve() if args.fixtures else None
+
+    workdir = Path(tempfile.mkdtemp(prefix='benchmarks-'))
+    server = start_offline_environment(workdir, fixtures)
+    results = {}
+    if not args.skip_startup:
+        results.update(bench_startup(server.base_url, args.startup_repeat))
+    os.environ['LAZY_STARTUP'] = '0'
+    results.update(bench_callbacks(args.repeat))
+    results.update(bench_utils(args.repeat))
+    results.update(bench_indicators(args.repeat))
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'created_at': dt.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'fixtures': str(fixtures) if fixtures else None,
+        },
+        'results': results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    for name, result in results.items():
+        print(f"{name:<60} p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms")
+    print(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
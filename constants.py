@@ -1,4 +1,59 @@
 import datetime as dt
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+env_file = Path(__file__).resolve().parent / '.env'
+load_dotenv(env_file)
+LAZY_STARTUP = os.environ.get('LAZY_STARTUP', '0') == '1'
+PRICE_FETCH_WORKERS = int(os.environ.get('PRICE_FETCH_WORKERS', 8))
+MAIN_GRAPH_MAX_POINTS = int(os.environ.get('MAIN_GRAPH_MAX_POINTS', 1000))
+ASSETS_LIMIT = int(os.environ.get('ASSETS_LIMIT', 0))  # 0 loads every listed asset
+TRACKED_ASSETS = int(os.environ.get('TRACKED_ASSETS', 10))  # Top assets with price history
+FIGURE_CACHE_SIZE = int(os.environ.get('FIGURE_CACHE_SIZE', 128))
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '0') == '1'
+STREAM_PRICES = os.environ.get('STREAM_PRICES', '0') == '1'
+PRICE_STREAM_URL = os.environ.get('PRICE_STREAM_URL', 'wss://ws.coincap.io/prices')
+PRICE_STREAM_BUFFER = int(os.environ.get('PRICE_STREAM_BUFFER', 3600))  # Ticks per asset
+PRICE_STREAM_INTERVAL = float(os.environ.get('PRICE_STREAM_INTERVAL', 2))  # In seconds
+PRICE_STREAM_MAX_POINTS = int(os.environ.get('PRICE_STREAM_MAX_POINTS', 5000))
+FAST_JSON = os.environ.get('FAST_JSON', '0') == '1'
+PRICE_DIGITS = int(os.environ.get('PRICE_DIGITS', 0))  # Significant digits, 0 keeps every digit
+CLIENTSIDE_CALLBACKS = os.environ.get('CLIENTSIDE_CALLBACKS', '0') == '1'
+STORE_REFRESH_INTERVAL = int(os.environ.get('STORE_REFRESH_INTERVAL', 60))  # In seconds
+HTTP_TIMEOUT = (  # Connect and read timeouts, in seconds
+    float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+    float(os.environ.get('HTTP_READ_TIMEOUT', 20)),
+)
+COINCAP_BASE_URL = os.environ.get('COINCAP_BASE_URL', 'https://api.coincap.io')
+FNG_BASE_URL = os.environ.get('FNG_BASE_URL', 'https://api.alternative.me')
+UPSTREAM_RATE_LIMITS = {  # Requests per second and burst size, per upstream
+    'alternative': (
+        float(os.environ.get('FNG_RATE_LIMIT', 1)),
+        int(os.environ.get('FNG_RATE_BURST', 2)),
+    ),
+    'coincap': (
+        float(os.environ.get('COINCAP_RATE_LIMIT', 3)),
+        int(os.environ.get('COINCAP_RATE_BURST', 5)),
+    ),
+}
+HTTP_MAX_ATTEMPTS = int(os.environ.get('HTTP_MAX_ATTEMPTS', 4))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+RATES_CACHE_TTL = float(os.environ.get('RATES_CACHE_TTL', 300))  # In seconds
+SHARED_DATASETS_DIR = os.environ.get('SHARED_DATASETS_DIR')
+SHARED_DATASETS_ROLE = os.environ.get('SHARED_DATASETS_ROLE', 'reader')
+SHARED_DATASETS_POLL_INTERVAL = float(os.environ.get('SHARED_DATASETS_POLL_INTERVAL', 2))
+SHARED_DATASETS_HEARTBEAT_TIMEOUT = float(os.environ.get('SHARED_DATASETS_HEARTBEAT_TIMEOUT', 30))  # In seconds
+REFRESH_INTERVALS = {  # In seconds
+    'assets': int(os.environ.get('REFRESH_INTERVAL_ASSETS', 60)),
+    'fiat_rates': int(os.environ.get('REFRESH_INTERVAL_FIAT_RATES', 3600)),
+    'main_graph': int(os.environ.get('REFRESH_INTERVAL_MAIN_GRAPH', 3600)),
+    'fng': int(os.environ.get('REFRESH_INTERVAL_FNG', 3600)),
+    'hourly_prices': int(os.environ.get('REFRESH_INTERVAL_HOURLY_PRICES', 900)),
+}
 
 
 TODAY = dt.datetime.today().strftime('%Y-%m-%d')
@@ -9,6 +64,24 @@ CURRENCY_SYMBOLS = {
     'GBP': '£',
     'CHF': '₣'
 }
+ASSETS_PAGE_LIMIT = 2000  # Largest page coincap serves
+RANKING_PAGE_SIZE = 20
+RSI_WINDOW = 14  # In hours
+RSI_HISTORY = dt.timedelta(days=30)
+RSI_MAX_POINTS = 700
+NAMED_TIME_RANGES = {
+    'Last Day': dt.timedelta(days=1),
+    'Last Week': dt.timedelta(weeks=1),
+    'Last Two Weeks': dt.timedelta(weeks=2),
+    'Last Month': dt.timedelta(days=30),
+    'Last Three Months': dt.timedelta(days=91),
+    'Last Six Months': dt.timedelta(days=182),
+    'Last Year': dt.timedelta(days=365),
+}
+MA_WINDOWS = {  # In days
+    '50 days': 50,
+    '200 days': 200,
+}
 COLORS = {
     'background': '#111111',
     'text': '#7FDBFF'
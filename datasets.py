@@ -0,0 +1,169 @@
+import datetime as dt
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from api import get_assets, get_fear_greed_data
+from cache import LRUCache
+from constants import (
+    CURRENCY_SYMBOLS, PRICE_STREAM_BUFFER, PRICE_STREAM_URL, REFRESH_INTERVALS, RSI_HISTORY,
+    RSI_MAX_POINTS, SHARED_DATASETS_DIR, SHARED_DATASETS_HEARTBEAT_TIMEOUT,
+    SHARED_DATASETS_POLL_INTERVAL, SHARED_DATASETS_ROLE, TRACKED_ASSETS
+)
+from indicators import MovingAverageCache, wilder_rsi
+from price_stream import PriceStream
+from ranking_table import RankingTable
+from refresh import Dataset, RefreshScheduler
+from shared_datasets import SharedDataset
+from timeseries import TimeSeries
+from utils import clean_price_data, clean_exchange_rates
+
+
+def make_dataset(
+    name: str,
+    loader: Callable[[], Any],
+    interval: float
+) -> Dataset:
+    # With SHARED_DATASETS_DIR set, workers map the datasets written by the
+    # publisher process instead of fetching them on their own
+    if SHARED_DATASETS_DIR and SHARED_DATASETS_ROLE == 'reader':
+        return SharedDataset(
+            name,
+            SHARED_DATASETS_DIR,
+            SHARED_DATASETS_POLL_INTERVAL,
+            heartbeat_timeout=SHARED_DATASETS_HEARTBEAT_TIMEOUT
+        )
+    return Dataset(name, loader, interval)
+
+
+def get_asset_names() -> List[str]:
+    # Only the top of the ranking gets price history and streamed prices
+    return (
+        ASSETS.require()
+        .nsmallest(TRACKED_ASSETS, 'rank')
+        .loc[:, 'id']
+        .to_list()
+    )
+
+
+_ranking_table_lock = threading.Lock()
+_ranking_table: Tuple[Tuple[int, int], Optional[RankingTable]] = ((0, 0), None)
+
+
+def get_ranking_table() -> RankingTable:
+    # Rebuilt once per assets or exchange rates refresh, with the records
+    # of every supported currency
+    global _ranking_table
+    assets, assets_version, _ = ASSETS.snapshot
+    rates, rates_version, _ = FIAT_RATES.snapshot
+    versions = (assets_version, rates_version)
+    with _ranking_table_lock:
+        if _ranking_table[0] != versions:
+            _ranking_table = (
+                versions, RankingTable(assets, rates, CURRENCY_SYMBOLS)
+            )
+        return _ranking_table[1]
+
+
+# Keyed by the hourly prices version too, so entries of older snapshots
+# are evicted as the current ones are added
+_rsi_cache = LRUCache('rsi', maxsize=2 * TRACKED_ASSETS)
+
+
+def get_rsi(asset: str, window: int) -> TimeSeries:
+    # Assets come from the client, so only tracked assets are cached
+    hourly_prices, version, _ = HOURLY_PRICES.snapshot
+    df_prices = hourly_prices.frame
+    if asset not in df_prices.columns:
+        return TimeSeries(pd.DataFrame({'timestamp': [], 'value': []}))
+    return _rsi_cache.get_or_create(
+        (asset, window, version),
+        lambda: TimeSeries(
+            df_prices
+            .loc[lambda x: x[asset].notna(), ['timestamp', asset]]
+            .assign(value=lambda x: wilder_rsi(x[asset].to_numpy(), window))
+            .loc[lambda x: x['value'].notna(), ['timestamp', 'value']]
+            .tail(RSI_MAX_POINTS)
+        )
+    )
+
+
+_ma_cache = MovingAverageCache()
+
+
+def get_moving_averages(asset: str, window: int) -> TimeSeries:
+    # Computed from the daily prices, updating only the bars added since the
+    # last refresh of the main graph dataset
+    df_prices = MAIN_GRAPH.get().frame
+    if asset not in df_prices.columns:
+        return TimeSeries(
+            pd.DataFrame({'timestamp': [], 'SMA': [], 'EMA': [], 'Price': []})
+        )
+    df_asset = df_prices.loc[lambda x: x[asset].notna(), ['timestamp', asset]]
+    timestamps = df_asset['timestamp'].to_numpy()
+    prices = df_asset[asset].to_numpy(dtype='float64')
+    ma = TimeSeries(pd.DataFrame({
+        'timestamp': timestamps,
+        'SMA': _ma_cache.get(asset, window, 'sma', timestamps, prices),
+        'EMA': _ma_cache.get(asset, window, 'ema', timestamps, prices),
+        'Price': prices,
+    }))
+    return ma
+
+
+ASSETS = make_dataset(
+    name='assets',
+    loader=get_assets,
+    interval=REFRESH_INTERVALS['assets'],
+)
+FIAT_RATES = make_dataset(
+    name='fiat_rates',
+    loader=lambda: clean_exchange_rates(
+        date=dt.date.today(),
+        currency_names=['USD', 'EUR', 'GBP', 'PLN', 'CHF'],
+    ),
+    interval=REFRESH_INTERVALS['fiat_rates'],
+)
+MAIN_GRAPH = make_dataset(
+    name='main_graph',
+    loader=lambda: TimeSeries(clean_price_data(
+        start=dt.datetime(2015, 1, 1),
+        end=dt.datetime.now(),
+        currencies=get_asset_names()
+    )),
+    interval=REFRESH_INTERVALS['main_graph'],
+)
+FNG = make_dataset(
+    name='fng',
+    loader=lambda: TimeSeries(get_fear_greed_data()),
+    interval=REFRESH_INTERVALS['fng'],
+)
+HOURLY_PRICES = make_dataset(
+    name='hourly_prices',
+    loader=lambda: TimeSeries(clean_price_data(
+        start=dt.datetime.now() - RSI_HISTORY,
+        end=dt.datetime.now(),
+        currencies=get_asset_names(),
+        interval='h1'
+    )),
+    interval=REFRESH_INTERVALS['hourly_prices'],
+)
+SCHEDULER = RefreshScheduler([
+    ASSETS, FIAT_RATES, MAIN_GRAPH, FNG, HOURLY_PRICES
+])
+# Started by app.py when STREAM_PRICES is set; it follows the assets in the
+# ranking, so it is resubscribed whenever they change
+PRICE_STREAM = PriceStream(PRICE_STREAM_URL, PRICE_STREAM_BUFFER)
+ASSETS.add_listener(lambda _: PRICE_STREAM.set_assets(get_asset_names()))
+
+
+def rebuild_ranking_table(_: Dataset) -> None:
+    # Materializes the ranking on the refresh thread instead of in the
+    # first callback after a refresh
+    if ASSETS.is_ready and FIAT_RATES.is_ready:
+        get_ranking_table()
+
+
+ASSETS.add_listener(rebuild_ranking_table)
+FIAT_RATES.add_listener(rebuild_ranking_table)
@@ -0,0 +1,161 @@
+import copy
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import plotly.io as pio
+
+from constants import COLORS
+
+
+# Figures are built as plain dicts straight from NumPy arrays, which skips
+# the DataFrame introspection of plotly.express and the validation of
+# graph_objects. The traces and layout mirror what px.line and px.scatter
+# produce, so the charts look the same.
+FigureDict = Dict[str, Any]
+Series = Tuple[str, np.ndarray, np.ndarray]  # Name, x and y
+WEBGL_THRESHOLD = 1000  # Points per figure above which px switches to WebGL
+
+
+def build_template() -> Dict[str, Any]:
+    # The default plotly template with the dashboard colors, built once and
+    # shared by every figure
+    template = copy.deepcopy(pio.templates['plotly'].to_plotly_json())
+    layout = template['layout']
+    layout['plot_bgcolor'] = COLORS['background']
+    layout['paper_bgcolor'] = COLORS['background']
+    for axis in ('xaxis', 'yaxis'):
+        layout[axis] = {**layout.get(axis, {}), 'showgrid': False, 'zeroline': False}
+    return template
+
+
+TEMPLATE = build_template()
+COLORWAY = TEMPLATE['layout']['colorway']
+
+
+def scatter_type(points: int) -> Dict[str, str]:
+    # Mirrors render_mode='auto' of plotly.express
+    if points > WEBGL_THRESHOLD:
+        return {'type': 'scattergl'}
+    return {'orientation': 'v', 'type': 'scatter'}
+
+
+def figure_layout(
+    x_label: str,
+    y_label: str,
+    legend_title: Optional[str] = None,
+    title: Optional[str] = None,
+    **extra: Any
+) -> Dict[str, Any]:
+    layout = {
+        'template': TEMPLATE,
+        'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0], 'title': {'text': x_label}},
+        'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': y_label}},
+        'legend': {'tracegroupgap': 0},
+        **extra,
+    }
+    if legend_title is not None:
+        layout['legend']['title'] = {'text': legend_title}
+    if title is not None:
+        layout['title'] = {'text': title}
+    else:
+        layout['margin'] = {'t': 60}
+    return layout
+
+
+def line_figure(
+    series: Sequence[Series],
+    x_label: str,
+    y_label: str,
+    legend_title: Optional[str] = 'variable',
+    title: Optional[str] = None,
+    **layout: Any
+) -> FigureDict:
+    # One line per series; without a legend title there is a single
+    # unnamed series, like px.line without color
+    trace_type = scatter_type(sum(len(x) for _, x, _ in series))
+    traces = []
+    for index, (name, x, y) in enumerate(series):
+        hover = f'{x_label}=%{{x}}<br>{y_label}=%{{y}}<extra></extra>'
+        if legend_title is not None:
+            hover = f'{legend_title}={name}<br>' + hover
+        else:
+            name = ''
+        traces.append({
+            'hovertemplate': hover,
+            'legendgroup': name,
+            'line': {'color': COLORWAY[index % len(COLORWAY)], 'dash': 'solid'},
+            'marker': {'symbol': 'circle'},
+            'mode': 'lines',
+            'name': name,
+            'showlegend': legend_title is not None,
+            'x': x,
+            'xaxis': 'x',
+            'y': y,
+            'yaxis': 'y',
+            **trace_type,
+        })
+    return {
+        'data': traces,
+        'layout': figure_layout(x_label, y_label, legend_title, title, **layout),
+    }
+
+
+def colored_line_figure(
+    x: np.ndarray,
+    y: np.ndarray,
+    x_label: str,
+    y_label: str,
+    colorscale: List[str],
+    title: Optional[str] = None
+) -> FigureDict:
+    # Markers colored by their own value on a continuous scale, like
+    # px.scatter(color=y) with mode='markers+lines'
+    steps = len(colorscale) - 1
+    return {
+        'data': [{
+            'hovertemplate': (
+                f'{x_label}=%{{x}}<br>{y_label}=%{{marker.color}}<extra></extra>'
+            ),
+            'legendgroup': '',
+            'marker': {'color': y, 'coloraxis': 'coloraxis', 'symbol': 'circle'},
+            'mode': 'markers+lines',
+            'name': '',
+            'showlegend': False,
+            'x': x,
+            'xaxis': 'x',
+            'y': y,
+            'yaxis': 'y',
+            **scatter_type(len(x)),
+        }],
+        'layout': figure_layout(
+            x_label,
+            y_label,
+            title=title,
+            coloraxis={
+                'colorbar': {'title': {'text': y_label}},
+                'colorscale': [
+                    [index / steps, color] for index, color in enumerate(colorscale)
+                ],
+            },
+        ),
+    }
+
+
+def placeholder_figure(message: str) -> FigureDict:
+    return {
+        'data': [],
+        'layout': {
+            'template': TEMPLATE,
+            'annotations': [{
+                'text': message,
+                'xref': 'paper',
+                'yref': 'paper',
+                'x': 0.5,
+                'y': 0.5,
+                'showarrow': False,
+                'font': {'color': COLORS['text'], 'size': 18},
+            }],
+            'xaxis': {'visible': False},
+            'yaxis': {'visible': False},
+        },
+    }
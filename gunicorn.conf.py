@@ -0,0 +1,21 @@
+import os
+
+
+publisher = None
+
+
+def on_starting(server):
+    # One publisher process loads every dataset and shares it with the
+    # workers through memory-mapped files; the arbiter restarts it when it
+    # exits
+    global publisher
+    shared_datasets_dir = os.environ.get('SHARED_DATASETS_DIR')
+    if shared_datasets_dir:
+        from shared_datasets import PublisherSupervisor
+        publisher = PublisherSupervisor(shared_datasets_dir)
+        publisher.start()
+
+
+def on_exit(server):
+    if publisher is not None:
+        publisher.stop()
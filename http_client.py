@@ -0,0 +1,185 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+)
+
+from constants import HTTP_MAX_ATTEMPTS, HTTP_POOL_SIZE, HTTP_TIMEOUT
+from metrics import (
+    UPSTREAM_DEDUPLICATED, UPSTREAM_FAILURES, UPSTREAM_LATENCY,
+    UPSTREAM_REQUESTS, UPSTREAM_RESPONSE_SIZE, UPSTREAM_RETRIES,
+    UPSTREAM_THROTTLE_WAIT, timed_parse
+)
+from rate_limit import PRIORITY_NAMES, current_priority, get_bucket
+
+
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+BACKOFF_MULTIPLIER = 0.5  # In seconds
+BACKOFF_MAX = 8  # In seconds
+
+
+class UpstreamError(Exception):
+    def __init__(
+        self,
+        endpoint: str,
+        url: str,
+        reason: str,
+        status: Optional[int] = None,
+        transient: bool = False
+    ) -> None:
+        super().__init__(endpoint, url, reason, status)
+        self.endpoint = endpoint
+        self.url = url
+        self.reason = reason
+        self.status = status
+        self.transient = transient
+        self.attempts = 1
+
+    def __str__(self) -> str:
+        status = f' (HTTP {self.status})' if self.status else ''
+        return (
+            f'{self.endpoint} failed after {self.attempts} attempt(s)' +
+            f'{status}: {self.reason}'
+        )
+
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    # One session for the whole process, so every thread reuses the same
+    # keep-alive connection pool per host.
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_SIZE,
+                    pool_maxsize=HTTP_POOL_SIZE,
+                    max_retries=0,
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def is_transient(exc: BaseException) -> bool:
+    return isinstance(exc, UpstreamError) and exc.transient
+
+
+def fetch_json(endpoint: str, url: str) -> Any:
+    # Endpoints are named '<upstream>.<resource>'
+    bucket = get_bucket(endpoint.split('.')[0])
+    if bucket is not None:
+        priority = current_priority()
+        waited = bucket.acquire(priority)
+        UPSTREAM_THROTTLE_WAIT.observe(
+            waited, endpoint=endpoint, priority=PRIORITY_NAMES[priority]
+        )
+    started = time.perf_counter()
+    try:
+        response = get_session().get(url, timeout=HTTP_TIMEOUT)
+    except (requests.ConnectionError, requests.Timeout) as exc:
+        record_request(endpoint, type(exc).__name__, started)
+        raise UpstreamError(endpoint, url, repr(exc), transient=True) from exc
+    except requests.RequestException as exc:
+        record_request(endpoint, type(exc).__name__, started)
+        raise UpstreamError(endpoint, url, repr(exc)) from exc
+    record_request(endpoint, str(response.status_code), started)
+    UPSTREAM_RESPONSE_SIZE.observe(len(response.content), endpoint=endpoint)
+    if response.status_code == 429 and bucket is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            bucket.pause(int(retry_after))
+    if response.status_code != 200:
+        raise UpstreamError(
+            endpoint,
+            url,
+            response.reason,
+            status=response.status_code,
+            transient=response.status_code in TRANSIENT_STATUS_CODES,
+        )
+    try:
+        with timed_parse(endpoint, stage='json'):
+            return response.json()
+    except ValueError as exc:
+        raise UpstreamError(
+            endpoint, url, 'invalid JSON', status=response.status_code
+        ) from exc
+
+
+def record_request(endpoint: str, status: str, started: float) -> None:
+    # Status is the HTTP status code, or the exception name when no
+    # response was received
+    UPSTREAM_REQUESTS.inc(endpoint=endpoint, status=status)
+    UPSTREAM_LATENCY.observe(
+        time.perf_counter() - started, endpoint=endpoint, status=status
+    )
+
+
+_inflight_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+
+
+def get_json(endpoint: str, url: str, *keys: str) -> Any:
+    payload = fetch_deduplicated(endpoint, url)
+    for key in keys:
+        try:
+            payload = payload[key]
+        except (KeyError, IndexError, TypeError) as exc:
+            UPSTREAM_FAILURES.inc(endpoint=endpoint)
+            raise UpstreamError(
+                endpoint, url, f'response has no {key!r} field'
+            ) from exc
+    return payload
+
+
+def fetch_deduplicated(endpoint: str, url: str) -> Any:
+    # Concurrent requests for the same URL share a single upstream fetch,
+    # including its retries; the payload must be treated as read-only
+    with _inflight_lock:
+        future = _inflight.get(url)
+        is_leader = future is None
+        if is_leader:
+            future = _inflight[url] = Future()
+    if not is_leader:
+        UPSTREAM_DEDUPLICATED.inc(endpoint=endpoint)
+        return future.result()
+    try:
+        payload = fetch_with_retries(endpoint, url)
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(payload)
+        return payload
+    finally:
+        with _inflight_lock:
+            del _inflight[url]
+
+
+def fetch_with_retries(endpoint: str, url: str) -> Any:
+    retrying = Retrying(
+        retry=retry_if_exception(is_transient),
+        wait=wait_random_exponential(multiplier=BACKOFF_MULTIPLIER, max=BACKOFF_MAX),
+        stop=stop_after_attempt(HTTP_MAX_ATTEMPTS),
+        reraise=True,
+    )
+    try:
+        return retrying(fetch_json, endpoint, url)
+    except UpstreamError as exc:
+        exc.attempts = retrying.statistics.get('attempt_number', 1)
+        UPSTREAM_FAILURES.inc(endpoint=endpoint)
+        raise
+    finally:
+        retries = retrying.statistics.get('attempt_number', 1) - 1
+        if retries:
+            UPSTREAM_RETRIES.inc(retries, endpoint=endpoint)
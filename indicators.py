@@ -0,0 +1,130 @@
+import threading
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def seeded_ewm(values: np.ndarray, window: int, alpha: float) -> np.ndarray:
+    # Seeded with the simple mean of the first window, then
+    # avg[i] = avg[i - 1] * (1 - alpha) + values[i] * alpha, evaluated by
+    # pandas' compiled EWM loop.
+    smoothed = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return smoothed
+    seeded = values[window - 1:].copy()
+    seeded[0] = values[:window].mean()
+    smoothed[window - 1:] = continue_ewm(seeded[0], seeded[1:], alpha, True)
+    return smoothed
+
+
+def continue_ewm(
+    last_value: float,
+    values: np.ndarray,
+    alpha: float,
+    include_last: bool = False
+) -> np.ndarray:
+    smoothed = (
+        pd.Series(np.concatenate([[last_value], values]))
+        .ewm(alpha=alpha, adjust=False)
+        .mean()
+        .to_numpy()
+    )
+    return smoothed if include_last else smoothed[1:]
+
+
+def wilder_rsi(prices: np.ndarray, window: int = 14) -> np.ndarray:
+    prices = np.asarray(prices, dtype='float64')
+    rsi = np.full(prices.shape, np.nan)
+    if len(prices) <= window:
+        return rsi
+    deltas = np.diff(prices)
+    avg_gain = seeded_ewm(np.clip(deltas, 0, None), window, 1 / window)
+    avg_loss = seeded_ewm(np.clip(-deltas, 0, None), window, 1 / window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi[1:] = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi[1:][(avg_loss == 0) & (avg_gain > 0)] = 100
+    rsi[1:][(avg_loss == 0) & (avg_gain == 0)] = 50
+    return rsi
+
+
+def simple_moving_average(prices: np.ndarray, window: int) -> np.ndarray:
+    prices = np.asarray(prices, dtype='float64')
+    sma = np.full(prices.shape, np.nan)
+    if len(prices) < window:
+        return sma
+    cumsum = np.cumsum(np.concatenate([[0.0], prices]))
+    sma[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return sma
+
+
+def exponential_moving_average(prices: np.ndarray, window: int) -> np.ndarray:
+    prices = np.asarray(prices, dtype='float64')
+    return seeded_ewm(prices, window, 2 / (window + 1))
+
+
+def extend_moving_average(
+    prices: np.ndarray,
+    values: np.ndarray,
+    window: int,
+    ma_type: str
+) -> np.ndarray:
+    # `values` holds the average of prices[:len(values)]; only the bars
+    # after it are computed.
+    start = len(values)
+    if start < window or start == len(prices):
+        return MA_FUNCTIONS[ma_type](prices, window)
+    if ma_type == 'sma':
+        tail = simple_moving_average(prices[start - window + 1:], window)
+        tail = tail[window - 1:]
+    else:
+        tail = continue_ewm(values[-1], prices[start:], 2 / (window + 1))
+    return np.concatenate([values, tail])
+
+
+MA_FUNCTIONS: Dict[str, Callable[[np.ndarray, int], np.ndarray]] = {
+    'sma': simple_moving_average,
+    'ema': exponential_moving_average,
+}
+
+
+class MovingAverageCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[
+            Tuple[str, int, str], Tuple[np.ndarray, np.ndarray, np.ndarray]
+        ] = {}
+
+    def get(
+        self,
+        asset: str,
+        window: int,
+        ma_type: str,
+        timestamps: np.ndarray,
+        prices: np.ndarray
+    ) -> np.ndarray:
+        key = (asset, window, ma_type)
+        with self._lock:
+            entry = self._entries.get(key)
+        values = None
+        if entry is not None:
+            old_timestamps, old_prices, old_values = entry
+            # The last stored bar may have been updated, so it is recomputed
+            keep = len(old_timestamps) - 1
+            if (
+                0 < keep <= len(timestamps) and
+                np.array_equal(old_timestamps[:keep], timestamps[:keep]) and
+                np.array_equal(old_prices[:keep], prices[:keep])
+            ):
+                if len(old_timestamps) == len(timestamps) and \
+                        np.array_equal(old_prices, prices):
+                    values = old_values
+                else:
+                    values = extend_moving_average(
+                        prices, old_values[:keep], window, ma_type
+                    )
+        if values is None:
+            values = MA_FUNCTIONS[ma_type](prices, window)
+        with self._lock:
+            self._entries[key] = (timestamps, prices, values)
+        return values
@@ -1,13 +1,17 @@
 import datetime as dt
-from typing import List
 
-import pandas as pd
 from dash import html, dcc
-from constants import CURRENCY_SYMBOLS, TODAY
+from constants import (
+    CURRENCY_SYMBOLS, PRICE_STREAM_INTERVAL, STORE_REFRESH_INTERVAL, TODAY
+)
 from layout.tab_sections import ranking, fng, ma, rsi 
 
 
-def render_layout(asset_names: List[str], df_fng: pd.DataFrame) -> html.Div:
+def render_layout(
+    is_ready: bool,
+    clientside: bool = False,
+    stream: bool = False
+) -> html.Div:
     title = (
         html.H1(
             children="Dash application for cryptocurrencies monitoring",
@@ -33,7 +37,7 @@ def render_layout(asset_names: List[str], df_fng: pd.DataFrame) -> html.Div:
                         html.Label('Select crypto: '),
                         dcc.Dropdown(
                             id='crypto-dropdown',
-                            options=asset_names,
+                            options=[],
                             value='bitcoin',
                             multi=True
                         ),
@@ -108,7 +112,7 @@ def render_layout(asset_names: List[str], df_fng: pd.DataFrame) -> html.Div:
                 dcc.Tab(
                     label='Fear and Greed Index',
                     children=[
-                        fng.render_fng_table(df_fng),
+                        html.Div(id='fng-table'),
                         fng.fng_selector_graph,
                         fng.fng_info_button
                     ],
@@ -166,9 +170,42 @@ def render_layout(asset_names: List[str], df_fng: pd.DataFrame) -> html.Div:
         ],
         className='tabs-menu'
     )
+    data_ready_poll = dcc.Interval(
+        id='data-ready-poll',
+        interval=2000,
+        disabled=is_ready
+    )
+    # In clientside mode the server only fills these stores with USD data,
+    # and the browser derives the visible components from them
+    if clientside:
+        data_stores = [
+            dcc.Interval(
+                id='data-refresh-poll',
+                interval=STORE_REFRESH_INTERVAL * 1000
+            ),
+            dcc.Store(id='fiat-rates-store'),
+            dcc.Store(id='crypto-graph-usd'),
+            dcc.Store(id='fng-figure-store'),
+            dcc.Store(id='rsi-figure-store'),
+            dcc.Store(id='ma-figure-store'),
+        ]
+    else:
+        data_stores = []
+    # New streamed prices are appended to the main graph with extendData
+    if stream:
+        data_stores += [
+            dcc.Interval(
+                id='price-stream-poll',
+                interval=PRICE_STREAM_INTERVAL * 1000
+            ),
+            dcc.Store(id='price-stream-start'),
+            dcc.Store(id='price-stream-cursor'),
+        ]
     layout = html.Div(
         className="main",
         children=[
+            data_ready_poll,
+            *data_stores,
             title,
             crypto_params_selector,
             crypto_graph,
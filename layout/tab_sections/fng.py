@@ -149,6 +149,21 @@ def render_fng_table(df_fng: pd.DataFrame) -> html.Section:
     return fng_gauge_table
 
 
+def render_fng_placeholder() -> html.Section:
+    fng_placeholder = (
+        html.Section(
+            children=[
+                html.Div(
+                    'Loading Fear and Greed Index data...',
+                    className='fng-part-data'
+                ),
+            ],
+            className='main-fng-box'
+        )
+    )
+    return fng_placeholder
+
+
 fng_selector_graph = (
     html.Section(
         children=[
@@ -161,7 +176,7 @@ fng_selector_graph = (
                             options=[
                                 'Last Week',
                                 'Last Month',
-                                'Last Six Month',
+                                'Last Six Months',
                                 'Last Year'
                             ],
                             value="Last Month",
@@ -5,6 +5,17 @@ from dash import html, dcc
 ma_params_selector = (
     html.Section(
         children=[
+            html.Div(
+                children=[
+                    html.Label('Select crypto: '),
+                    dcc.Dropdown(
+                        id='ma-asset',
+                        options=[],
+                        value='bitcoin',
+                    ),
+                ],
+                className='select-data higher-width'
+            ),
             html.Div(
                 children=[
                     html.Label('Select MA type: '),
@@ -41,12 +52,12 @@ ma_params_selector = (
                     dcc.Dropdown(
                         id='ma-period',
                         options=[
-                            'Last Day',
-                            'Last Week',
-                            'Last Two Weeks',
-                            'Last Month'
+                            'Last Month',
+                            'Last Three Months',
+                            'Last Six Months',
+                            'Last Year'
                         ],
-                        value="Last Month",
+                        value="Last Three Months",
                     ),
                 ],
                 className='select-data higher-width'
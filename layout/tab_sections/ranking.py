@@ -2,7 +2,7 @@ import dash_daq as daq
 import dash_bootstrap_components as dbc
 from dash import html, dash_table
 
-from constants import COLORS, CURRENCY_SYMBOLS
+from constants import COLORS, CURRENCY_SYMBOLS, RANKING_PAGE_SIZE
 
 
 warning_alert = (
@@ -81,6 +81,17 @@ crypto_prices_table = (
             html.H2(id="table-header"),
             dash_table.DataTable(
                 id='crypto-table',
+                # Paging, sorting and filtering run on the server, which
+                # only sends the rows of the current page
+                page_action='custom',
+                page_current=0,
+                page_size=RANKING_PAGE_SIZE,
+                page_count=1,
+                sort_action='custom',
+                sort_mode='single',
+                sort_by=[],
+                filter_action='custom',
+                filter_query='',
                 merge_duplicate_headers=True,
                 fill_width=False,
                 style_header={
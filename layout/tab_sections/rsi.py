@@ -5,6 +5,17 @@ from dash import html, dcc
 rsi_period_selector = (
     html.Section(
         children=[
+            html.Div(
+                children=[
+                    html.Label('Select crypto: '),
+                    dcc.Dropdown(
+                        id='rsi-asset',
+                        options=[],
+                        value='bitcoin',
+                    )
+                ],
+                className='select-data higher-width'
+            ),
             html.Div(
                 children=[
                     html.Label('Select time range:'),
@@ -0,0 +1,324 @@
+import bisect
+import functools
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dash.exceptions import PreventUpdate
+
+
+Labels = Tuple[Tuple[str, str], ...]
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # In seconds
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)  # In bytes
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        )
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str) -> None:
+        super().__init__(name, description)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, labels, value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, description)
+        self.buckets = tuple(buckets)
+        # Per label set: a count per bucket (the last one is +Inf) and a sum
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        with self._lock:
+            values = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._values.items()
+            ]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket',
+                    labels + (('le', format_value(float(bound))),),
+                    cumulative
+                )
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self.register(Counter(name, description))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, description, buckets))
+
+    def render(self) -> str:
+        # Prometheus text exposition format 0.0.4
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CALLBACK_CALLS = REGISTRY.counter(
+    'dash_callback_calls_total', 'Dash callback calls.'
+)
+CALLBACK_PREVENTED = REGISTRY.counter(
+    'dash_callback_prevented_total', 'Dash callback calls that raised PreventUpdate.'
+)
+CALLBACK_EXCEPTIONS = REGISTRY.counter(
+    'dash_callback_exceptions_total', 'Dash callback calls that raised an exception.'
+)
+CALLBACK_LATENCY = REGISTRY.histogram(
+    'dash_callback_latency_seconds', 'Dash callback latency, including serialization.'
+)
+CALLBACK_RESPONSE_SIZE = REGISTRY.histogram(
+    'dash_callback_response_bytes', 'Size of the serialized callback responses.',
+    buckets=SIZE_BUCKETS
+)
+
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'upstream_requests_total', 'Upstream HTTP requests, one per attempt.'
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    'upstream_request_duration_seconds', 'Upstream HTTP request duration, per attempt.'
+)
+UPSTREAM_RESPONSE_SIZE = REGISTRY.histogram(
+    'upstream_response_bytes', 'Size of the upstream response bodies.',
+    buckets=SIZE_BUCKETS
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    'upstream_retries_total', 'Upstream requests retried after a transient failure.'
+)
+UPSTREAM_FAILURES = REGISTRY.counter(
+    'upstream_failures_total', 'Upstream fetches that failed after every attempt.'
+)
+UPSTREAM_PARSE_LATENCY = REGISTRY.histogram(
+    'upstream_parse_duration_seconds',
+    'Time spent decoding upstream JSON and building DataFrames from it.'
+)
+UPSTREAM_CACHE = REGISTRY.counter(
+    'upstream_cache_lookups_total',
+    'Lookups in the local caches in front of upstream endpoints, by result.'
+)
+UPSTREAM_THROTTLE_WAIT = REGISTRY.histogram(
+    'upstream_throttle_wait_seconds',
+    'Time upstream requests waited for the rate limit of their host.'
+)
+UPSTREAM_DEDUPLICATED = REGISTRY.counter(
+    'upstream_deduplicated_total',
+    'Upstream fetches served by an identical request already in flight.'
+)
+
+
+@contextmanager
+def timed_parse(endpoint: str, stage: str = 'dataframe') -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        UPSTREAM_PARSE_LATENCY.observe(
+            time.perf_counter() - started, endpoint=endpoint, stage=stage
+        )
+
+
+class SamplingProfiler:
+    # Samples the stack of the threads running an armed callback every
+    # interval seconds and keeps the counts of the collapsed stacks, the
+    # input format of flamegraph.pl and speedscope
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.callback: Optional[str] = None
+        self.remaining_calls = 0
+        self.stacks: StackCounter = StackCounter()
+        self._threads: Dict[int, int] = {}  # Thread id to nesting depth
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def arm(self, callback: str, calls: int) -> None:
+        with self._lock:
+            self.callback = callback
+            self.remaining_calls = calls
+            self.stacks = StackCounter()
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(
+                target=self._run, name='callback-profiler', daemon=True
+            )
+            self._sampler.start()
+
+    def should_profile(self, callback: str) -> bool:
+        with self._lock:
+            if self.callback != callback or self.remaining_calls <= 0:
+                return False
+            self.remaining_calls -= 1
+            return True
+
+    def enter(self) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+
+    def exit(self) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] -= 1
+            if not self._threads[thread_id]:
+                del self._threads[thread_id]
+
+    @property
+    def is_active(self) -> bool:
+        with self._lock:
+            return self.remaining_calls > 0 or bool(self._threads)
+
+    def collapsed(self) -> str:
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def _run(self) -> None:
+        # Stops once the armed calls are done, so it costs nothing otherwise
+        while self.is_active:
+            with self._lock:
+                thread_ids = list(self._threads)
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+                    frame = frame.f_back
+                if stack:
+                    with self._lock:
+                        self.stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+
+PROFILER = SamplingProfiler()
+
+
+def instrument(func: Callable, callback: str, output: str) -> Callable:
+    labels = {'callback': callback, 'output': output}
+
+    @functools.wraps(func)
+    def instrumented(*args: Any, **kwargs: Any) -> Any:
+        profile = PROFILER.should_profile(callback)
+        if profile:
+            PROFILER.enter()
+        started = time.perf_counter()
+        try:
+            response = func(*args, **kwargs)
+        except PreventUpdate:
+            CALLBACK_PREVENTED.inc(**labels)
+            raise
+        except Exception as exc:
+            CALLBACK_EXCEPTIONS.inc(exception=type(exc).__name__, **labels)
+            raise
+        finally:
+            CALLBACK_LATENCY.observe(time.perf_counter() - started, **labels)
+            CALLBACK_CALLS.inc(**labels)
+            if profile:
+                PROFILER.exit()
+        CALLBACK_RESPONSE_SIZE.observe(len(response), **labels)
+        return response
+
+    return instrumented
+
+
+def instrument_callbacks(callback_map: Dict[str, Dict[str, Any]]) -> None:
+    # Wraps the registered server callbacks in place, so this has to run
+    # after every callback is defined
+    for output, entry in callback_map.items():
+        # Clientside callbacks have no server function
+        func = entry.get('callback')
+        if func is None or getattr(func, 'is_instrumented', False):
+            continue
+        output_ids = ','.join(
+            part for part in output.strip('.').split('...')
+        )
+        entry['callback'] = instrument(func, func.__name__, output_ids)
+        entry['callback'].is_instrumented = True
@@ -1,21 +1,54 @@
 import datetime as dt
-from typing import Dict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
 
 import pandas as pd
-from sqlalchemy import create_engine, Column, Date, String, Integer, Float
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import (
+    create_engine, event, select, Column, String, Integer, Float
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker, Session
 
+from cache import TTLCache
+from constants import DB_POOL_SIZE, RATES_CACHE_TTL
+from metrics import UPSTREAM_CACHE
 
-engine = create_engine('sqlite:///exchange_rates_cache.db', echo=False)
+
+engine = create_engine(
+    'sqlite:///exchange_rates_cache.db',
+    echo=False,
+    pool_size=DB_POOL_SIZE,
+    pool_pre_ping=True,
+    connect_args={'check_same_thread': False, 'timeout': 30},
+)
 base = declarative_base()
-db_session = sessionmaker(bind=engine)
-session = db_session()
+db_session = scoped_session(sessionmaker(bind=engine))
+rates_cache = TTLCache('exchange_rates', ttl=RATES_CACHE_TTL)
+
+
+@event.listens_for(engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets readers run while a refresh thread is writing
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    # Every thread gets its own session, which is released when done
+    session = db_session()
+    try:
+        yield session
+    finally:
+        db_session.remove()
 
 
 class ExchangeRates(base):
     __tablename__ = "exchange_rates"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    date = Column(String)
+    date = Column(String, index=True)
     USD = Column(Float)
     PLN = Column(Float)
     EUR = Column(Float)
@@ -31,22 +64,148 @@ class ExchangeRates(base):
         self.CHF = CHF
 
 
+class PriceHistory(base):
+    __tablename__ = "price_history"
+    asset = Column(String, primary_key=True)
+    interval = Column(String, primary_key=True)
+    timestamp = Column(Integer, primary_key=True)  # In miliseconds
+    price_usd = Column(Float)
+
+
+class PriceHistorySync(base):
+    __tablename__ = "price_history_sync"
+    asset = Column(String, primary_key=True)
+    interval = Column(String, primary_key=True)
+    first_timestamp = Column(Integer)  # In miliseconds
+    last_timestamp = Column(Integer)  # In miliseconds
+
+
 base.metadata.create_all(engine)
+for index in ExchangeRates.__table__.indexes:
+    # create_all skips existing tables, so older databases get the index here
+    index.create(engine, checkfirst=True)
+
+
+def to_unix_ms(date: dt.datetime) -> int:
+    return int(date.replace(tzinfo=dt.timezone.utc).timestamp() * 1000)
+
+
+def from_unix_ms(timestamp: int) -> dt.datetime:
+    return (
+        dt.datetime
+        .fromtimestamp(timestamp / 1000, dt.timezone.utc)
+        .replace(tzinfo=None)
+    )
 
 
-def get_exchange_rates(date: dt.date) -> pd.DataFrame:
+def get_exchange_rates(date: dt.date) -> Optional[Dict[str, float]]:
+    rates = rates_cache.get(date.isoformat())
+    if rates is not None:
+        UPSTREAM_CACHE.inc(endpoint='coincap.rates', result='memory')
+        return rates
     query = (
-        session
-        .query(ExchangeRates)
-        .filter(ExchangeRates.date == date)
+        select(ExchangeRates)
+        .where(ExchangeRates.date == date.isoformat())
         .order_by(ExchangeRates.id.desc())
         .limit(1)
     )
-    df = pd.read_sql(con=engine, sql=query.statement)
-    return df
+    with session_scope() as session:
+        obj = session.execute(query).scalars().first()
+        if obj is None:
+            UPSTREAM_CACHE.inc(endpoint='coincap.rates', result='miss')
+            return None
+        rates = {
+            'USD': obj.USD,
+            'PLN': obj.PLN,
+            'EUR': obj.EUR,
+            'GBP': obj.GBP,
+            'CHF': obj.CHF,
+        }
+    rates_cache.set(date.isoformat(), rates)
+    UPSTREAM_CACHE.inc(endpoint='coincap.rates', result='sqlite')
+    return rates
+
+
+def save_exchange_rates(date: dt.date, rates: Dict[str, float]) -> None:
+    obj = ExchangeRates(date=date.isoformat(), **rates)
+    with session_scope() as session:
+        session.add(obj)
+        session.commit()
+    rates_cache.set(date.isoformat(), dict(rates))
+
+
+def get_price_history_sync(
+    asset: str,
+    interval: str
+) -> Optional[Tuple[dt.datetime, dt.datetime]]:
+    with session_scope() as session:
+        sync = session.get(PriceHistorySync, (asset, interval))
+        if sync is None:
+            return None
+        return (
+            from_unix_ms(sync.first_timestamp),
+            from_unix_ms(sync.last_timestamp)
+        )
+
+
+def get_price_history(
+    asset: str,
+    interval: str,
+    start: dt.datetime,
+    end: dt.datetime
+) -> pd.DataFrame:
+    query = (
+        select(PriceHistory.price_usd, PriceHistory.timestamp)
+        .where(
+            (PriceHistory.asset == asset) &
+            (PriceHistory.interval == interval) &
+            (PriceHistory.timestamp.between(to_unix_ms(start), to_unix_ms(end)))
+        )
+        .order_by(PriceHistory.timestamp)
+    )
+    with engine.connect() as connection:
+        df = pd.read_sql(con=connection, sql=query)
+    df_cleaned = (
+        df
+        .rename(columns={'price_usd': 'priceUsd'})
+        .astype({'priceUsd': 'float64', 'timestamp': 'datetime64[ms]'})
+    )
+    return df_cleaned
 
 
-def save_exchange_rates(record: Dict[str, float]) -> None:
-    obj = ExchangeRates(**record)
-    session.add(obj)
-    session.commit()
+def save_price_history(
+    asset: str,
+    interval: str,
+    start: dt.datetime,
+    df: pd.DataFrame
+) -> None:
+    timestamps = df['timestamp'].astype('datetime64[ms]').astype('int64')
+    records = [
+        {
+            'asset': asset,
+            'interval': interval,
+            'timestamp': timestamp,
+            'price_usd': price,
+        }
+        for timestamp, price in zip(timestamps.to_list(), df['priceUsd'].to_list())
+    ]
+    stmt = insert(PriceHistory)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['asset', 'interval', 'timestamp'],
+        set_={'price_usd': stmt.excluded.price_usd}
+    )
+    with session_scope() as session:
+        session.execute(stmt, records)
+        sync = session.get(PriceHistorySync, (asset, interval))
+        if sync is None:
+            sync = PriceHistorySync(
+                asset=asset,
+                interval=interval,
+                first_timestamp=to_unix_ms(start),
+                last_timestamp=max(timestamps),
+            )
+            session.add(sync)
+        else:
+            sync.first_timestamp = min(sync.first_timestamp, to_unix_ms(start))
+            sync.last_timestamp = max(sync.last_timestamp, max(timestamps))
+        session.commit()
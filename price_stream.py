@@ -0,0 +1,109 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import websocket
+
+from ring_buffer import RingBuffer
+
+
+logger = logging.getLogger(__name__)
+RECONNECT_MIN = 1  # In seconds
+RECONNECT_MAX = 60  # In seconds
+
+
+class PriceStream:
+    # Subscribes to a coincap style price feed, where every message maps
+    # asset ids to their latest USD price, and keeps the ticks of each asset
+    # in its own ring buffer. Reconnects with exponential backoff.
+    def __init__(self, url: str, capacity: int) -> None:
+        self.url = url
+        self.capacity = capacity
+        self.buffers: Dict[str, RingBuffer] = {}
+        self.connected = False
+        self._assets: List[str] = []
+        self._lock = threading.Lock()
+        self._socket: Optional[websocket.WebSocketApp] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def buffer(self, asset: str) -> Optional[RingBuffer]:
+        return self.buffers.get(asset)
+
+    def set_assets(self, assets: List[str]) -> None:
+        # Buffers of assets that are no longer subscribed are dropped, so
+        # memory stays bounded by the subscription size
+        with self._lock:
+            if list(assets) == self._assets:
+                return
+            self._assets = list(assets)
+            self.buffers = {
+                asset: self.buffers.get(asset) or RingBuffer(self.capacity)
+                for asset in assets
+            }
+            socket = self._socket
+        if socket is not None:
+            # The run loop reconnects with the new subscription
+            socket.close()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='price-stream', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        with self._lock:
+            socket = self._socket
+        if socket is not None:
+            socket.close()
+
+    def _on_open(self, _: websocket.WebSocketApp) -> None:
+        self.connected = True
+        logger.info('Price stream connected to %s', self.url)
+
+    def _on_message(self, _: websocket.WebSocketApp, message: str) -> None:
+        time_ms = int(time.time() * 1000)
+        try:
+            prices = json.loads(message)
+        except ValueError:
+            logger.warning('Ignoring malformed price message %r', message[:100])
+            return
+        buffers = self.buffers
+        for asset, price in prices.items():
+            buffer = buffers.get(asset)
+            if buffer is not None:
+                buffer.append(time_ms, float(price))
+
+    def _run(self) -> None:
+        delay = RECONNECT_MIN
+        while not self._stop_event.is_set():
+            with self._lock:
+                assets = self._assets
+            if not assets:
+                self._stop_event.wait(RECONNECT_MIN)
+                continue
+            socket = websocket.WebSocketApp(
+                f"{self.url}?assets={','.join(assets)}",
+                on_open=self._on_open,
+                on_message=self._on_message,
+            )
+            with self._lock:
+                self._socket = socket
+            started = time.monotonic()
+            socket.run_forever(ping_interval=30, ping_timeout=10)
+            self.connected = False
+            with self._lock:
+                self._socket = None
+            if time.monotonic() - started > RECONNECT_MAX:
+                delay = RECONNECT_MIN
+            if not self._stop_event.is_set():
+                logger.info('Price stream disconnected, reconnecting in %ss', delay)
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
@@ -0,0 +1,257 @@
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+ListOfDicts = List[Dict[str, Any]]
+COLUMNS = [  # Column id (formatted with the currency symbol), field, decimals
+    ('Pos', 'rank', None),
+    ('Logo', 'logo', None),
+    ('Crypto Name', 'name', None),
+    ('Symbol', 'symbol', None),
+    ('Price[{symbol}]', 'priceUsd', 4),
+    ('Supply', 'supply', 2),
+    ('MarketCap[{symbol}]', 'marketCapUsd', 2),
+    ('Change24h[%]', 'changePercent24Hr', 2),
+]
+USD_FIELDS = {'priceUsd', 'marketCapUsd'}  # Converted to the base currency
+TEXT_FIELDS = {'name', 'symbol'}
+SORT_DIRECTIONS = ('asc', 'desc')
+QUOTES = '"\'`'
+# Relational operators of the DataTable filter_query syntax
+FILTER_OPERATORS = {
+    '>=': np.greater_equal, 'ge': np.greater_equal,
+    '<=': np.less_equal, 'le': np.less_equal,
+    '!=': np.not_equal, 'ne': np.not_equal,
+    '>': np.greater, 'gt': np.greater,
+    '<': np.less, 'lt': np.less,
+    '=': np.equal, 'eq': np.equal,
+}
+# Symbolic operators are listed longest first, so '>=' is not read as '>'
+FILTER_PART = re.compile(
+    r'^\s*\{(?P<column>[^}]+)\}\s*'
+    r'(?P<operator>>=|<=|!=|>|<|=|ge|le|ne|gt|lt|eq|icontains|scontains|contains)'
+    r'\s*(?P<value>.*?)\s*$'
+)
+
+
+class RankingTable:
+    # Built once per assets or exchange rates refresh: every sortable field
+    # is argsorted up front and the rows of every currency are materialized
+    # as records, so a request only filters and picks the records of the
+    # visible page from the precomputed order
+    def __init__(
+        self,
+        assets: pd.DataFrame,
+        rates: Dict[str, float],
+        currency_symbols: Dict[str, str]
+    ) -> None:
+        df = assets.sort_values(by=['rank'], kind='stable').reset_index(drop=True)
+        self.rates = rates
+        self.currency_symbols = currency_symbols
+        # Column ids of every currency, since sort_by keeps the ids of the
+        # currency it was set in
+        self.column_fields = {
+            column_id: field
+            for currency_symbol in currency_symbols.values()
+            for column_id, field in self.column_ids(currency_symbol).items()
+        }
+        self.fields: Dict[str, np.ndarray] = {
+            field: df[field].to_numpy()
+            for _, field, _ in COLUMNS if field != 'logo'
+        }
+        self.fields['logo'] = (
+            '[![Coin](https://cryptologos.cc/logos/' +
+            df['id'] + '-' + df['symbol'].str.lower() +
+            '-logo.svg?v=023#thumbnail)](https://cryptologos.cc/)'
+        ).to_numpy()
+        self._lower = {
+            field: np.char.lower(self.fields[field].astype('str'))
+            for field in TEXT_FIELDS
+        }
+        # Missing values go last in both directions
+        self._orders: Dict[Tuple[str, str], np.ndarray] = {}
+        for _, field, _ in COLUMNS:
+            if field == 'logo':
+                continue
+            for direction in SORT_DIRECTIONS:
+                self._orders[(field, direction)] = (
+                    df[field]
+                    .sort_values(
+                        ascending=direction == 'asc', kind='stable',
+                        na_position='last'
+                    )
+                    .index
+                    .to_numpy()
+                )
+        self.payloads: Dict[str, Tuple[ListOfDicts, ListOfDicts]] = {
+            currency: (
+                self.columns(currency_symbols[currency]),
+                self.records(currency_symbols[currency], rates[currency])
+            )
+            for currency in currency_symbols
+        }
+
+    def __len__(self) -> int:
+        return len(self.fields['rank'])
+
+    @staticmethod
+    def column_ids(currency_symbol: str) -> Dict[str, str]:
+        return {
+            column.format(symbol=currency_symbol): field
+            for column, field, _ in COLUMNS
+        }
+
+    @staticmethod
+    def columns(currency_symbol: str) -> ListOfDicts:
+        columns = []
+        for column, field, _ in COLUMNS:
+            column_id = column.format(symbol=currency_symbol)
+            if field == 'logo':
+                columns.append({
+                    'id': column_id,
+                    'name': column_id,
+                    'presentation': 'markdown',
+                })
+            elif field in TEXT_FIELDS:
+                columns.append({'id': column_id, 'name': column_id, 'type': 'text'})
+            else:
+                columns.append({'id': column_id, 'name': column_id, 'type': 'numeric'})
+        return columns
+
+    def sort_key(self, sort_by: Optional[ListOfDicts]) -> Tuple[str, str]:
+        # The field and direction of the first sorted column; malformed
+        # entries sort by rank
+        if sort_by and isinstance(sort_by[0], dict):
+            field = self.column_fields.get(sort_by[0].get('column_id'))
+            direction = sort_by[0].get('direction')
+            if field not in (None, 'logo') and direction in SORT_DIRECTIONS:
+                return field, direction
+        return 'rank', 'asc'
+
+    def localize_sort_by(
+        self,
+        sort_by: Optional[ListOfDicts],
+        currency: str
+    ) -> ListOfDicts:
+        # Renames the sorted columns to their ids in the given currency, so
+        # the table keeps showing the sort after a currency switch
+        currency_symbol = self.currency_symbols[currency]
+        column_ids = {
+            field: column_id
+            for column_id, field in self.column_ids(currency_symbol).items()
+        }
+        localized = []
+        for entry in sort_by or []:
+            if isinstance(entry, dict):
+                field = self.column_fields.get(entry.get('column_id'))
+                if field is not None:
+                    entry = {**entry, 'column_id': column_ids[field]}
+            localized.append(entry)
+        return localized
+
+    def filter_mask(
+        self,
+        filter_query: Optional[str],
+        currency_symbol: str,
+        rate: float
+    ) -> Optional[np.ndarray]:
+        # Supports the '{column} operator value' clauses joined by '&&'
+        # that the DataTable filter row produces; unparsable clauses, like
+        # the ones typed half way, are ignored
+        if not filter_query:
+            return None
+        column_ids = self.column_ids(currency_symbol)
+        mask = None
+        for part in filter_query.split(' && '):
+            match = FILTER_PART.match(part)
+            if match is None:
+                continue
+            field = column_ids.get(match['column'])
+            if field is None or field == 'logo':
+                continue
+            clause = self._clause(field, match['operator'], match['value'], rate)
+            if clause is None:
+                continue
+            mask = clause if mask is None else mask & clause
+        return mask
+
+    def _clause(
+        self,
+        field: str,
+        operator: str,
+        raw_value: str,
+        rate: float
+    ) -> Optional[np.ndarray]:
+        # Quotes are stripped from each end on their own, so a value whose
+        # closing quote is not typed yet still matches
+        value = raw_value
+        if value[:1] in QUOTES:
+            value = value[1:]
+        if value[-1:] in QUOTES:
+            value = value[:-1]
+        if not value:
+            return None
+        if field in TEXT_FIELDS:
+            # Like the DataTable, only icontains ignores case
+            if operator == 'icontains':
+                return np.char.find(self._lower[field], value.lower()) >= 0
+            text = self.fields[field].astype('str')
+            if operator in ('contains', 'scontains'):
+                return np.char.find(text, value) >= 0
+            if operator in ('=', 'eq'):
+                return np.char.equal(text, value)
+            if operator in ('!=', 'ne'):
+                return np.char.not_equal(text, value)
+            return None
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        values = self.fields[field]
+        if field in USD_FIELDS:
+            # Values are typed in the base currency
+            values = values * rate
+        compare = FILTER_OPERATORS.get(operator, np.equal)
+        with np.errstate(invalid='ignore'):
+            return compare(values, number)
+
+    def records(self, currency_symbol: str, rate: float) -> ListOfDicts:
+        # Every row in rank order, as plain Python values
+        columns = {}
+        for column, field, decimals in COLUMNS:
+            values = self.fields[field]
+            if field in USD_FIELDS:
+                values = values * rate
+            if decimals is not None:
+                values = np.round(values.astype('float64'), decimals)
+                values = np.where(np.isnan(values), None, values)
+            columns[column.format(symbol=currency_symbol)] = values.tolist()
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    def page(
+        self,
+        currency: str,
+        page_current: int,
+        page_size: int,
+        sort_by: Optional[ListOfDicts] = None,
+        filter_query: Optional[str] = None
+    ) -> Tuple[ListOfDicts, ListOfDicts, int]:
+        # Returns the columns, the records of the requested page and the
+        # page count
+        currency_symbol = self.currency_symbols[currency]
+        columns, records = self.payloads[currency]
+        start = page_current * page_size
+        if not sort_by and not filter_query:
+            # Records are stored in rank order, the default view
+            page_count = max(math.ceil(len(records) / page_size), 1)
+            return columns, records[start:start + page_size], page_count
+        order = self._orders[self.sort_key(sort_by)]
+        mask = self.filter_mask(filter_query, currency_symbol, self.rates[currency])
+        if mask is not None:
+            order = order[mask[order]]
+        page_count = max(math.ceil(len(order) / page_size), 1)
+        return columns, [records[row] for row in order[start:start + page_size]], page_count
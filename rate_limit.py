@@ -0,0 +1,96 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from constants import UPSTREAM_RATE_LIMITS
+
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+_priority: ContextVar[int] = ContextVar('upstream_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def upstream_priority(priority: int) -> Iterator[None]:
+    # Applies to the upstream requests made in this context; thread pools
+    # need contextvars.copy_context() to pass it on to their workers
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class TokenBucket:
+    # Waiting requests are served in priority order, then first come first
+    # served, so background refreshes never delay a queued interactive one
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - max(self._updated, self._paused_until)
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int = INTERACTIVE) -> float:
+        # Returns how long the caller waited, in seconds
+        started = time.monotonic()
+        ticket = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiters[0] == ticket:
+                    if now >= self._paused_until and self._tokens >= 1:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= 1
+                        self._condition.notify_all()
+                        return now - started
+                    timeout = max(
+                        self._paused_until - now,
+                        (1 - self._tokens) / self.rate,
+                    )
+                    self._condition.wait(timeout)
+                else:
+                    self._condition.wait()
+
+    def pause(self, seconds: float) -> None:
+        # Used when the host asks us to back off (HTTP 429 with Retry-After)
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._condition.notify_all()
+
+
+_buckets_lock = threading.Lock()
+_buckets: Dict[str, Optional[TokenBucket]] = {}
+
+
+def get_bucket(upstream: str) -> Optional[TokenBucket]:
+    # Buckets are keyed by upstream rather than host, so upstreams served
+    # from the same host (like the stand-in server) keep separate quotas.
+    # Upstreams without a configured limit, or with a rate of 0 or less,
+    # are not throttled; the burst is at least one request.
+    with _buckets_lock:
+        if upstream not in _buckets:
+            rate, burst = UPSTREAM_RATE_LIMITS.get(upstream, (0, 0))
+            _buckets[upstream] = TokenBucket(rate, max(burst, 1)) if rate > 0 else None
+        return _buckets[upstream]
@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from rate_limit import BACKGROUND, INTERACTIVE, upstream_priority
+
+
+logger = logging.getLogger(__name__)
+RETRY_INTERVAL = 15  # In seconds
+
+
+class DatasetNotReady(Exception):
+    pass
+
+
+class Snapshot(NamedTuple):
+    value: Any
+    version: int
+    loaded_at: Optional[float]
+
+
+class Dataset:
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        interval: float
+    ) -> None:
+        self.name = name
+        self.loader = loader
+        self.interval = interval
+        self.last_error: Optional[Exception] = None
+        self._listeners: List[Callable[['Dataset'], None]] = []
+        self._refresh_lock = threading.Lock()
+        self._snapshot = Snapshot(value=None, version=0, loaded_at=None)
+
+    def add_listener(self, listener: Callable[['Dataset'], None]) -> None:
+        # Listeners run on the refresh thread after every successful swap
+        self._listeners.append(listener)
+
+    @property
+    def snapshot(self) -> Snapshot:
+        # Value and version are swapped together as a single reference, so
+        # readers never see a new value with an old version or vice versa.
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    @property
+    def is_ready(self) -> bool:
+        return self._snapshot.version > 0
+
+    @property
+    def is_orphaned(self) -> bool:
+        # Datasets loaded by this process are refreshed here, so only the
+        # shared datasets can lose the process that refreshes them
+        return False
+
+    def get(self) -> Any:
+        return self._snapshot.value
+
+    def require(self) -> Any:
+        snapshot = self._snapshot
+        if snapshot.version == 0:
+            raise DatasetNotReady(self.name)
+        return snapshot.value
+
+    def status(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'ready': snapshot.version > 0,
+            'version': snapshot.version,
+            'loaded_at': snapshot.loaded_at,
+            'last_error': repr(self.last_error) if self.last_error else None,
+        }
+
+    def refresh(self) -> bool:
+        # Until a dataset is ready users are waiting for it, so its upstream
+        # requests go ahead of the refreshes of datasets already loaded
+        priority = BACKGROUND if self.is_ready else INTERACTIVE
+        with self._refresh_lock, upstream_priority(priority):
+            try:
+                value = self.loader()
+            except DatasetNotReady as exc:
+                logger.info('Refresh of dataset %s waits for %s', self.name, exc)
+                self.last_error = exc
+                return False
+            except Exception as exc:
+                logger.exception('Refresh of dataset %s failed', self.name)
+                self.last_error = exc
+                return False
+            self._swap(value, self._snapshot.version + 1)
+            return True
+
+    def _swap(self, value: Any, version: int) -> None:
+        self._snapshot = Snapshot(
+            value=value,
+            version=version,
+            loaded_at=time.time(),
+        )
+        self.last_error = None
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception:
+                logger.exception('Listener of dataset %s failed', self.name)
+
+
+class RefreshScheduler:
+    def __init__(self, datasets: List[Dataset]) -> None:
+        self.datasets = datasets
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def is_ready(self) -> bool:
+        return all(dataset.is_ready for dataset in self.datasets)
+
+    @property
+    def is_orphaned(self) -> bool:
+        return any(dataset.is_orphaned for dataset in self.datasets)
+
+    def load_all(self) -> None:
+        # Datasets are loaded in declaration order, so later loaders can
+        # rely on the values of earlier ones.
+        for dataset in self.datasets:
+            dataset.refresh()
+
+    def start(self, load_first: bool = False) -> None:
+        # With load_first, the initial load also runs in the background, so
+        # start() returns before any dataset is ready.
+        if self._threads:
+            return
+        self._stop_event.clear()
+        if load_first:
+            thread = threading.Thread(
+                target=self._load_and_run,
+                name='refresh-initial-load',
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        else:
+            self._start_threads()
+
+    def _load_and_run(self) -> None:
+        self.load_all()
+        if not self._stop_event.is_set():
+            self._start_threads()
+
+    def _start_threads(self) -> None:
+        for dataset in self.datasets:
+            thread = threading.Thread(
+                target=self._run,
+                args=(dataset,),
+                name=f'refresh-{dataset.name}',
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        for thread in list(self._threads):
+            thread.join()
+        self._threads = []
+
+    def _run(self, dataset: Dataset) -> None:
+        # Datasets that never loaded are retried sooner than their interval
+        while True:
+            if dataset.is_ready:
+                interval = dataset.interval
+            else:
+                interval = min(dataset.interval, RETRY_INTERVAL)
+            if self._stop_event.wait(interval):
+                return
+            dataset.refresh()
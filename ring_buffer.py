@@ -0,0 +1,43 @@
+import threading
+from typing import Tuple
+
+import numpy as np
+
+
+class RingBuffer:
+    # Fixed-size buffer of (timestamp, value) points. Readers ask for the
+    # points after the last timestamp they saw, which stays meaningful in
+    # every process; points that were overwritten in between are skipped.
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.total = 0
+        self._times = np.zeros(capacity, dtype='int64')  # In miliseconds
+        self._values = np.zeros(capacity, dtype='float64')
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def append(self, time_ms: int, value: float) -> None:
+        with self._lock:
+            index = self.total % self.capacity
+            self._times[index] = time_ms
+            self._values[index] = value
+            self.total += 1
+
+    def after(self, time_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Returns copies of the points newer than `time_ms`, oldest first.
+        # Points are appended in time order, so a binary search finds them.
+        with self._lock:
+            start = max(self.total - self.capacity, 0)
+            indices = np.arange(start, self.total) % self.capacity
+            times = self._times[indices]
+            cut = np.searchsorted(times, time_ms, side='right')
+            return times[cut:], self._values[indices[cut:]]
+
+    def latest(self) -> Tuple[int, float]:
+        with self._lock:
+            if not self.total:
+                raise IndexError('empty ring buffer')
+            index = (self.total - 1) % self.capacity
+            return int(self._times[index]), float(self._values[index])
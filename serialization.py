@@ -0,0 +1,44 @@
+import logging
+
+import numpy as np
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+
+
+logger = logging.getLogger(__name__)
+
+
+def configure_json_engine(fast: bool) -> str:
+    # Dash serializes callback responses and the layout with
+    # plotly.io.json.to_json_plotly, so its default engine applies to every
+    # response. orjson encodes NumPy arrays natively; objects it cannot
+    # encode still go through plotly's cleaning step first.
+    if fast:
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            logger.warning('FAST_JSON is set but orjson is not installed, using json')
+        else:
+            pio.json.config.default_engine = 'orjson'
+    # plotly imports orjson lazily on the first call, which can fail with a
+    # partially initialized module when the first requests are concurrent
+    to_json_plotly({'warmup': np.zeros(1)})
+    return pio.json.config.default_engine
+
+
+def round_significant(values: np.ndarray, digits: int) -> np.ndarray:
+    # Rounds to `digits` significant digits, or returns the values as they
+    # are when digits is 0. Scaling by exact powers of ten keeps the
+    # rounded values short in the JSON output.
+    if not digits:
+        return values
+    values = np.asarray(values, dtype='float64')
+    with np.errstate(divide='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    decimals = digits - 1 - np.where(np.isfinite(magnitude), magnitude, 0)
+    scale = 10.0 ** np.abs(decimals)
+    return np.where(
+        decimals >= 0,
+        np.round(values * scale) / scale,
+        np.round(values / scale) * scale
+    )
@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from constants import SHARED_DATASETS_ROLE
+from refresh import Dataset, DatasetNotReady
+from timeseries import TimeSeries
+
+
+logger = logging.getLogger(__name__)
+CURRENT_FILE = 'CURRENT'
+HEARTBEAT_FILE = 'HEARTBEAT'
+KEPT_VERSIONS = 3
+RESTART_MIN = 1  # In seconds
+RESTART_MAX = 60  # In seconds
+HEARTBEAT_INTERVAL = 1  # In seconds
+
+
+def is_matrix(value: Any) -> bool:
+    # Time series whose value columns are all floats of one dtype are stored
+    # as memory-mappable arrays, everything else is pickled
+    if not isinstance(value, TimeSeries):
+        return False
+    dtypes = value.frame.drop(columns=[value.time_column]).dtypes
+    return len(dtypes) > 0 and dtypes.nunique() == 1 and dtypes.iloc[0].kind == 'f'
+
+
+def write_version(directory: Path, value: Any) -> None:
+    if is_matrix(value):
+        frame = value.frame
+        columns = [c for c in frame.columns if c != value.time_column]
+        np.save(directory / 'timestamps.npy', frame[value.time_column].to_numpy())
+        np.save(directory / 'values.npy', frame[columns].to_numpy())
+        meta = {
+            'kind': 'matrix',
+            'time_column': value.time_column,
+            'columns': columns,
+        }
+    else:
+        with open(directory / 'value.pkl', 'wb') as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = {'kind': 'pickle'}
+    with open(directory / 'meta.json', 'w') as file:
+        json.dump(meta, file)
+
+
+def read_version(directory: Path) -> Any:
+    with open(directory / 'meta.json') as file:
+        meta = json.load(file)
+    if meta['kind'] == 'pickle':
+        with open(directory / 'value.pkl', 'rb') as file:
+            return pickle.load(file)
+    # Both arrays stay memory-mapped read-only, so every worker shares the
+    # same page cache instead of holding a private copy
+    timestamps = np.load(directory / 'timestamps.npy', mmap_mode='r')
+    values = np.load(directory / 'values.npy', mmap_mode='r')
+    frame = pd.DataFrame(values, columns=meta['columns'], copy=False)
+    frame.insert(0, meta['time_column'], timestamps)
+    return TimeSeries(frame, time_column=meta['time_column'])
+
+
+def publish(root: Path, dataset: Dataset) -> None:
+    # Versions are millisecond timestamps, so they keep increasing across
+    # publisher restarts and never collide with what readers have cached
+    last_version = read_current_version(root, dataset.name) or 0
+    version = max(int(time.time() * 1000), last_version + 1)
+    dataset_dir = root / dataset.name
+    tmp_dir = dataset_dir / f'.tmp-{version}'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    write_version(tmp_dir, dataset.get())
+    os.rename(tmp_dir, dataset_dir / str(version))
+    tmp_current = dataset_dir / f'.{CURRENT_FILE}-{version}'
+    tmp_current.write_text(str(version))
+    os.replace(tmp_current, dataset_dir / CURRENT_FILE)
+    versions = sorted(
+        int(path.name) for path in dataset_dir.iterdir() if path.name.isdigit()
+    )
+    for old_version in versions[:-KEPT_VERSIONS]:
+        # Readers still mapping an old version keep their pages until they
+        # drop the reference
+        shutil.rmtree(dataset_dir / str(old_version), ignore_errors=True)
+    logger.info('Published dataset %s version %s', dataset.name, version)
+
+
+def write_heartbeat(root: Path) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    (root / HEARTBEAT_FILE).touch()
+
+
+def read_heartbeat(root: Path) -> Optional[float]:
+    # Returns the time of the last heartbeat of the publisher
+    try:
+        return (root / HEARTBEAT_FILE).stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def read_current_version(root: Path, name: str) -> Optional[int]:
+    try:
+        return int((root / name / CURRENT_FILE).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class SharedDataset(Dataset):
+    def __init__(
+        self,
+        name: str,
+        root: Path,
+        interval: float,
+        heartbeat_timeout: float
+    ) -> None:
+        super().__init__(name, loader=self.read_current, interval=interval)
+        self.root = Path(root)
+        self.heartbeat_timeout = heartbeat_timeout  # In seconds
+
+    @property
+    def is_orphaned(self) -> bool:
+        # The publisher writes a heartbeat on every loop, whether or not its
+        # refreshes succeed, so this only tells whether it is still running
+        heartbeat = read_heartbeat(self.root)
+        return heartbeat is None or time.time() - heartbeat > self.heartbeat_timeout
+
+    def status(self) -> Dict[str, Any]:
+        return {**super().status(), 'orphaned': self.is_orphaned}
+
+    def read_current(self) -> Any:
+        version = read_current_version(self.root, self.name)
+        if version is None:
+            raise DatasetNotReady(self.name)
+        return read_version(self.root / self.name / str(version))
+
+    def refresh(self) -> bool:
+        # Polls the published version and only maps a new one when it changed
+        with self._refresh_lock:
+            version = read_current_version(self.root, self.name)
+            if version is None:
+                self.last_error = DatasetNotReady(self.name)
+                return False
+            if version == self.version:
+                return True
+            try:
+                value = read_version(self.root / self.name / str(version))
+            except Exception as exc:
+                logger.exception('Reading shared dataset %s failed', self.name)
+                self.last_error = exc
+                return False
+            self._swap(value, version)
+            return True
+
+
+def run_publisher(root: str) -> None:
+    # With the publisher role, datasets builds the real datasets instead of
+    # reading the shared ones. It imports this module, hence the late import.
+    if SHARED_DATASETS_ROLE != 'publisher':
+        raise SystemExit('The publisher needs SHARED_DATASETS_ROLE=publisher')
+    logging.basicConfig(level=logging.INFO)
+    from datasets import SCHEDULER
+
+    for dataset in SCHEDULER.datasets:
+        dataset.add_listener(lambda dataset: publish(Path(root), dataset))
+    # The initial load runs in the background, so the heartbeat keeps going
+    # while a restarted publisher waits on a slow upstream
+    SCHEDULER.start(load_first=True)
+    # Exits once orphaned, so a killed gunicorn master does not leave the
+    # publisher behind
+    parent = os.getppid()
+    while os.getppid() == parent:
+        write_heartbeat(Path(root))
+        time.sleep(HEARTBEAT_INTERVAL)
+
+
+def start_publisher_process(root: str) -> subprocess.Popen:
+    # A plain subprocess in its own session: forked gunicorn workers
+    # inherit no handle on it, so their exit cannot signal or reap it
+    return subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve())],
+        env={
+            **os.environ,
+            'SHARED_DATASETS_DIR': root,
+            'SHARED_DATASETS_ROLE': 'publisher',
+        },
+        start_new_session=True,
+    )
+
+
+class PublisherSupervisor:
+    # Runs in the gunicorn arbiter and restarts the publisher whenever it
+    # exits, with exponential backoff when it keeps failing
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.process: Optional[subprocess.Popen] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.process = start_publisher_process(self.root)
+        self._thread = threading.Thread(
+            target=self._run, name='publisher-supervisor', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def _run(self) -> None:
+        delay = RESTART_MIN
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            returncode = self.process.wait()
+            if self._stop_event.is_set():
+                return
+            if time.monotonic() - started > RESTART_MAX:
+                delay = RESTART_MIN
+            logger.warning(
+                'Dataset publisher exited with code %s, restarting in %ss',
+                returncode, delay
+            )
+            if self._stop_event.wait(delay):
+                return
+            self.process = start_publisher_process(self.root)
+            delay = min(delay * 2, RESTART_MAX)
+
+
+if __name__ == '__main__':
+    run_publisher(os.environ['SHARED_DATASETS_DIR'])
@@ -0,0 +1,554 @@
+import argparse
+import base64
+import datetime as dt
+import hashlib
+import json
+import logging
+import random
+import select
+import socket
+import struct
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+FIAT_RATES = {  # Units of USD per unit of currency
+    'USD': ('united-states-dollar', '$', 1.0),
+    'EUR': ('euro', '€', 1.0834),
+    'GBP': ('british-pound-sterling', '£', 1.2671),
+    'PLN': ('polish-zloty', 'zł', 0.2498),
+    'CHF': ('swiss-franc', 'Fr.', 1.1203),
+    'JPY': ('japanese-yen', '¥', 0.0067),
+}
+KNOWN_ASSETS = [
+    ('bitcoin', 'BTC', 'Bitcoin'),
+    ('ethereum', 'ETH', 'Ethereum'),
+    ('tether', 'USDT', 'Tether'),
+    ('binance-coin', 'BNB', 'BNB'),
+    ('solana', 'SOL', 'Solana'),
+    ('xrp', 'XRP', 'XRP'),
+    ('usd-coin', 'USDC', 'USDC'),
+    ('cardano', 'ADA', 'Cardano'),
+    ('dogecoin', 'DOGE', 'Dogecoin'),
+    ('tron', 'TRX', 'TRON'),
+    ('polkadot', 'DOT', 'Polkadot'),
+    ('chainlink', 'LINK', 'Chainlink'),
+    ('polygon', 'MATIC', 'Polygon'),
+    ('litecoin', 'LTC', 'Litecoin'),
+    ('bitcoin-cash', 'BCH', 'Bitcoin Cash'),
+]
+INTERVALS = {  # In miliseconds
+    'm1': 60 * 1000,
+    'm5': 5 * 60 * 1000,
+    'm15': 15 * 60 * 1000,
+    'm30': 30 * 60 * 1000,
+    'h1': 60 * 60 * 1000,
+    'h2': 2 * 60 * 60 * 1000,
+    'h6': 6 * 60 * 60 * 1000,
+    'h12': 12 * 60 * 60 * 1000,
+    'd1': 24 * 60 * 60 * 1000,
+}
+HISTORY_START = dt.datetime(2013, 1, 1, tzinfo=dt.timezone.utc)
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+FNG_CLASSIFICATIONS = [
+    (25, 'Extreme Fear'),
+    (45, 'Fear'),
+    (55, 'Neutral'),
+    (75, 'Greed'),
+    (101, 'Extreme Greed'),
+]
+
+
+def seed_for(*parts: Any) -> int:
+    return zlib.crc32('/'.join(str(part) for part in parts).encode())
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def websocket_frame(opcode: int, payload: bytes) -> bytes:
+    # Server frames are final and unmasked
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 2 ** 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('websocket closed by the client')
+        data += chunk
+    return data
+
+
+def read_websocket_frame(connection: socket.socket) -> Tuple[int, bytes]:
+    first, second = receive_exactly(connection, 2)
+    length = second & 0x7f
+    if length == 126:
+        length, = struct.unpack('!H', receive_exactly(connection, 2))
+    elif length == 127:
+        length, = struct.unpack('!Q', receive_exactly(connection, 8))
+    mask = receive_exactly(connection, 4) if second & 0x80 else b'\0\0\0\0'
+    payload = receive_exactly(connection, length)
+    payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+    return first & 0x0f, payload
+
+
+class Fixtures:
+    # Synthetic responses are deterministic for a given seed and day, so
+    # repeated runs see the same market; recorded fixtures, when present,
+    # take precedence over them
+    def __init__(
+        self,
+        fixtures_dir: Optional[Path] = None,
+        asset_count: int = 100,
+        pad_bytes: int = 0,
+        seed: int = 0
+    ) -> None:
+        self.fixtures_dir = fixtures_dir
+        self.asset_count = asset_count
+        self.padding = 'x' * pad_bytes
+        self.seed = seed
+
+    def load(self, name: str) -> Optional[Any]:
+        if self.fixtures_dir is None:
+            return None
+        path = self.fixtures_dir / name
+        if not path.exists():
+            return None
+        with path.open() as fixture:
+            return json.load(fixture)
+
+    def pad(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.padding:
+            return [{**record, 'padding': self.padding} for record in records]
+        return records
+
+    def rates(self) -> Dict[str, Any]:
+        recorded = self.load('rates.json')
+        if recorded is not None:
+            return recorded
+        data = [
+            {
+                'id': currency_id,
+                'symbol': symbol,
+                'currencySymbol': currency_symbol,
+                'type': 'fiat',
+                'rateUsd': f'{rate_usd:.16f}',
+            }
+            for symbol, (currency_id, currency_symbol, rate_usd)
+            in FIAT_RATES.items()
+        ]
+        return {'data': self.pad(data), 'timestamp': now_ms()}
+
+    def assets(self, limit: int, offset: int) -> Dict[str, Any]:
+        recorded = self.load('assets.json')
+        if recorded is not None:
+            data = recorded['data']
+        else:
+            data = self.synthetic_assets(dt.date.today())
+        return {
+            'data': self.pad(data[offset:offset + limit]),
+            'timestamp': now_ms(),
+        }
+
+    @lru_cache(maxsize=4)
+    def synthetic_assets(self, day: dt.date) -> List[Dict[str, Any]]:
+        assets = []
+        for index in range(self.asset_count):
+            if index < len(KNOWN_ASSETS):
+                asset_id, symbol, name = KNOWN_ASSETS[index]
+            else:
+                asset_id = f'asset-{index:04d}'
+                symbol = f'A{index:04d}'
+                name = f'Asset {index:04d}'
+            rng = np.random.default_rng(seed_for(self.seed, asset_id, day))
+            price = 60000 / (index + 1) ** 1.5 * rng.uniform(0.5, 1.5)
+            supply = 2e7 * rng.uniform(0.5, 50)
+            assets.append({
+                'id': asset_id,
+                'symbol': symbol,
+                'name': name,
+                'supply': supply,
+                'maxSupply': None,
+                'marketCapUsd': price * supply,
+                'volumeUsd24Hr': price * supply * rng.uniform(0.01, 0.1),
+                'priceUsd': price,
+                'changePercent24Hr': rng.normal(0, 3),
+                'vwap24Hr': price * rng.uniform(0.98, 1.02),
+                'explorer': f'https://example.com/explorer/{asset_id}',
+            })
+        # Ranked in list order, so the well known assets come first
+        for rank, asset in enumerate(assets, start=1):
+            asset['rank'] = str(rank)
+            for key in ['supply', 'marketCapUsd', 'volumeUsd24Hr',
+                        'priceUsd', 'changePercent24Hr', 'vwap24Hr']:
+                asset[key] = f'{asset[key]:.16f}'
+        return assets
+
+    def history(
+        self,
+        asset_id: str,
+        interval: str,
+        start: int,
+        end: int
+    ) -> Dict[str, Any]:
+        recorded = self.load(f'history/{asset_id}-{interval}.json')
+        if recorded is not None:
+            data = [
+                point for point in recorded['data']
+                if start <= point['time'] <= end
+            ]
+            return {'data': self.pad(data), 'timestamp': now_ms()}
+        step = INTERVALS[interval]
+        times, prices = self.synthetic_history(
+            asset_id, interval, now_ms() // step
+        )
+        lo = np.searchsorted(times, start, side='left')
+        hi = np.searchsorted(times, end, side='right')
+        data = [
+            {
+                'priceUsd': f'{price:.16f}',
+                'time': int(time_ms),
+                'date': (
+                    dt.datetime.fromtimestamp(time_ms / 1000, dt.timezone.utc)
+                    .strftime('%Y-%m-%dT%H:%M:%S.000Z')
+                ),
+            }
+            for time_ms, price in zip(times[lo:hi], prices[lo:hi])
+        ]
+        return {'data': self.pad(data), 'timestamp': now_ms()}
+
+    @lru_cache(maxsize=64)
+    def synthetic_history(
+        self,
+        asset_id: str,
+        interval: str,
+        periods: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # A random walk from HISTORY_START up to the current period. The
+        # seed does not depend on the period, so every point keeps its value
+        # as the series grows, like the incremental fetches expect.
+        step = INTERVALS[interval]
+        first = -(-int(HISTORY_START.timestamp() * 1000) // step) * step
+        if step < INTERVALS['h1']:
+            first = (periods - 2 * INTERVALS['d1'] // step) * step
+        times = np.arange(first, (periods + 1) * step, step, dtype='int64')
+        rng = np.random.default_rng(seed_for(self.seed, asset_id, interval))
+        base_price = 10 ** rng.uniform(-1, 4)
+        volatility = 0.04 * np.sqrt(step / INTERVALS['d1'])
+        prices = base_price * np.exp(
+            np.cumsum(rng.normal(0, volatility, len(times)))
+        )
+        return times, prices
+
+    def fng(self, limit: int, date_format: str) -> Dict[str, Any]:
+        recorded = self.load('fng.json')
+        if recorded is not None:
+            data = recorded['data']
+        else:
+            data = self.synthetic_fng(dt.date.today(), date_format)
+        if limit > 0:
+            data = data[:limit]
+        return {
+            'name': 'Fear and Greed Index',
+            'data': self.pad(data),
+            'metadata': {'error': None},
+        }
+
+    @lru_cache(maxsize=4)
+    def synthetic_fng(self, day: dt.date, date_format: str) -> List[Dict[str, Any]]:
+        # A mean reverting walk around 50, oldest value first
+        days = (day - HISTORY_START.date()).days
+        rng = np.random.default_rng(seed_for(self.seed, 'fng', day))
+        values = np.empty(days)
+        value = 50.0
+        for index, shock in enumerate(rng.normal(0, 6, days)):
+            value = min(max(value + 0.1 * (50 - value) + shock, 0), 100)
+            values[index] = value
+        values = values.round().astype(int)
+        formats = {'us': '%m-%d-%Y', 'cn': '%Y-%m-%d', 'kr': '%Y-%m-%d'}
+        data = []
+        for offset, value in enumerate(values[::-1]):
+            date = day - dt.timedelta(days=offset)
+            if date_format in formats:
+                timestamp = date.strftime(formats[date_format])
+            else:
+                timestamp = str(int(
+                    dt.datetime(date.year, date.month, date.day,
+                                tzinfo=dt.timezone.utc).timestamp()
+                ))
+            label = next(
+                label for bound, label in FNG_CLASSIFICATIONS if value < bound
+            )
+            data.append({
+                'value': str(value),
+                'value_classification': label,
+                'timestamp': timestamp,
+            })
+        return data
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server: 'StandinServer'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        self.server.delay()
+        if self.server.should_fail():
+            self.send_json(
+                self.server.error_status, {'error': 'Injected failure'}
+            )
+            return
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+        fixtures = self.server.fixtures
+        if parts == ['prices'] and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self.stream_prices(query.get('assets', 'bitcoin').split(','))
+            return
+        try:
+            if parts == ['v2', 'rates']:
+                body = fixtures.rates()
+            elif parts == ['v2', 'assets']:
+                body = fixtures.assets(
+                    int(query.get('limit', 100)), int(query.get('offset', 0))
+                )
+            elif len(parts) == 4 and parts[:2] == ['v2', 'assets'] and parts[3] == 'history':
+                body = fixtures.history(
+                    parts[2],
+                    query['interval'],
+                    int(float(query.get('start', 0))),
+                    int(float(query.get('end', now_ms()))),
+                )
+            elif parts == ['fng']:
+                body = fixtures.fng(
+                    int(query.get('limit', 1)), query.get('date_format', '')
+                )
+            else:
+                self.send_json(404, {'error': f'Unknown endpoint {url.path}'})
+                return
+        except (KeyError, ValueError) as exc:
+            self.send_json(400, {'error': f'Bad request: {exc}'})
+            return
+        self.send_json(200, body)
+
+    def stream_prices(self, assets: List[str]) -> None:
+        # A coincap style price feed: every tick sends the new USD prices of
+        # some of the subscribed assets, as {"asset": "price"}
+        key = self.headers.get('Sec-WebSocket-Key', '')
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        # Prices continue from the end of the synthetic hourly history
+        periods = now_ms() // INTERVALS['h1']
+        prices = {
+            asset: float(self.server.fixtures.synthetic_history(asset, 'h1', periods)[1][-1])
+            for asset in assets
+        }
+        rng = random.Random(seed_for(self.server.fixtures.seed, 'prices', *assets))
+        connection = self.connection
+        try:
+            while True:
+                readable, _, _ = select.select(
+                    [connection], [], [], self.server.tick_interval
+                )
+                if readable:
+                    opcode, payload = read_websocket_frame(connection)
+                    if opcode == 0x8:  # Close
+                        connection.sendall(websocket_frame(0x8, payload[:2]))
+                        return
+                    if opcode == 0x9:  # Ping
+                        connection.sendall(websocket_frame(0xa, payload))
+                    continue
+                moved = rng.sample(assets, rng.randint(1, len(assets)))
+                for asset in moved:
+                    prices[asset] *= 1 + rng.gauss(0, 0.001)
+                message = json.dumps({
+                    asset: f'{prices[asset]:.8f}' for asset in moved
+                })
+                connection.sendall(websocket_frame(0x1, message.encode()))
+        except OSError:
+            return
+
+    def send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        fixtures: Fixtures,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        tick_interval: float = 1.0
+    ) -> None:
+        super().__init__(address, StandinHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tick_interval = tick_interval
+        self._random = random.Random(fixtures.seed)
+        self._random_lock = threading.Lock()
+
+    def delay(self) -> None:
+        with self._random_lock:
+            seconds = self.latency + self._random.uniform(0, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def should_fail(self) -> bool:
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_standin_server(
+    host: str = '127.0.0.1',
+    port: int = 0,
+    **kwargs: Any
+) -> StandinServer:
+    # Serves from a background thread; port 0 picks a free port
+    fixtures = Fixtures(
+        fixtures_dir=kwargs.pop('fixtures_dir', None),
+        asset_count=kwargs.pop('asset_count', 100),
+        pad_bytes=kwargs.pop('pad_bytes', 0),
+        seed=kwargs.pop('seed', 0),
+    )
+    server = StandinServer((host, port), fixtures, **kwargs)
+    thread = threading.Thread(
+        target=server.serve_forever, name='standin-server', daemon=True
+    )
+    thread.start()
+    return server
+
+
+def record(output: Path, asset_count: int) -> None:
+    # Saves live responses in the layout Fixtures reads. History is saved
+    # over the full ranges the app requests, and replayed for any subrange.
+    from constants import COINCAP_BASE_URL, FNG_BASE_URL, RSI_HISTORY
+    from http_client import get_json
+
+    (output / 'history').mkdir(parents=True, exist_ok=True)
+
+    def save(name: str, body: Any) -> None:
+        with (output / name).open('w') as fixture:
+            json.dump(body, fixture)
+        logger.info('Recorded %s', name)
+
+    save('rates.json', get_json('coincap.rates', f'{COINCAP_BASE_URL}/v2/rates'))
+    assets = get_json(
+        'coincap.assets', f'{COINCAP_BASE_URL}/v2/assets?limit={asset_count}'
+    )
+    save('assets.json', assets)
+    save('fng.json', get_json(
+        'alternative.fng', f'{FNG_BASE_URL}/fng/?limit=0&date_format=us'
+    ))
+    end = now_ms()
+    ranges = {
+        'd1': int(dt.datetime(2015, 1, 1, tzinfo=dt.timezone.utc).timestamp() * 1000),
+        'h1': end - int(RSI_HISTORY.total_seconds() * 1000),
+    }
+    for asset in assets['data']:
+        for interval, start in ranges.items():
+            url = (
+                f"{COINCAP_BASE_URL}/v2/assets/{asset['id']}/history?" +
+                f"interval={interval}&start={start}&end={end}"
+            )
+            save(
+                f"history/{asset['id']}-{interval}.json",
+                get_json('coincap.history', url)
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Local stand-in for the coincap and alternative.me APIs'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help='serve synthetic or recorded responses')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8555)
+    serve.add_argument('--fixtures', type=Path, help='directory written by "record"')
+    serve.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    serve.add_argument('--jitter', type=float, default=0.0, help='extra random latency, in seconds')
+    serve.add_argument('--error-rate', type=float, default=0.0, help='fraction of failed requests')
+    serve.add_argument('--error-status', type=int, default=503)
+    serve.add_argument('--asset-count', type=int, default=100, help='number of synthetic assets')
+    serve.add_argument('--pad-bytes', type=int, default=0, help='padding added to every record')
+    serve.add_argument('--seed', type=int, default=0)
+    serve.add_argument('--tick-interval', type=float, default=1.0, help='seconds between price stream messages')
+    rec = subparsers.add_parser('record', help='record live responses as fixtures')
+    rec.add_argument('output', type=Path)
+    rec.add_argument('--asset-count', type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'record':
+        record(args.output, args.asset_count)
+        return
+    fixtures = Fixtures(args.fixtures, args.asset_count, args.pad_bytes, args.seed)
+    server = StandinServer(
+        (args.host, args.port),
+        fixtures,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tick_interval=args.tick_interval,
+    )
+    logger.info(
+        'Serving on %s; set COINCAP_BASE_URL and FNG_BASE_URL to it, ' +
+        'and PRICE_STREAM_URL to %s/prices',
+        server.base_url,
+        server.base_url.replace('http://', 'ws://')
+    )
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import datetime as dt
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from constants import NAMED_TIME_RANGES
+
+
+class TimeSeries:
+    def __init__(self, df: pd.DataFrame, time_column: str = 'timestamp') -> None:
+        # Already sorted frames are kept as they are, so frames backed by
+        # shared or memory-mapped arrays are not copied
+        if not df[time_column].is_monotonic_increasing:
+            df = df.sort_values(by=[time_column], kind='stable')
+        self.frame = df
+        self.time_column = time_column
+        self._timestamps = self.frame[time_column].to_numpy()
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.frame.columns.to_list()
+
+    @property
+    def latest(self) -> Optional[pd.Timestamp]:
+        if len(self._timestamps) == 0:
+            return None
+        return pd.Timestamp(self._timestamps[-1])
+
+    def _position(self, time: dt.datetime, side: str) -> int:
+        bound = pd.Timestamp(time).to_datetime64().astype(self._timestamps.dtype)
+        return int(np.searchsorted(self._timestamps, bound, side=side))
+
+    def between(self, start: dt.datetime, end: dt.datetime) -> pd.DataFrame:
+        # Both bounds are inclusive, like Series.between; the rows are
+        # located by binary search and returned as a positional slice
+        first = self._position(start, 'left')
+        last = self._position(end, 'right')
+        return self.frame.iloc[first:last]
+
+    def last(self, time_range: str) -> pd.DataFrame:
+        # Unknown range names return the whole series
+        if time_range not in NAMED_TIME_RANGES or self.latest is None:
+            return self.frame
+        end = self.latest
+        return self.between(end - NAMED_TIME_RANGES[time_range], end)
@@ -1,89 +1,186 @@
+import contextvars
 import datetime as dt
-import functools as ft
-from typing import Dict, List
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 
 import api
 import models
+from constants import PRICE_FETCH_WORKERS
+from downsampling import lttb_indices
+from http_client import UpstreamError
+from metrics import UPSTREAM_CACHE
+
+
+logger = logging.getLogger(__name__)
+EMPTY_HISTORY = {'priceUsd': [], 'timestamp': []}
+
+
+def load_asset_history(
+    start: dt.datetime,
+    end: dt.datetime,
+    currency: str,
+    interval: str = 'd1'
+) -> pd.DataFrame:
+    # Only the tail after the last stored bar is requested from coincap;
+    # the last bar itself is fetched again since it may still be moving.
+    sync = models.get_price_history_sync(currency, interval)
+    if sync is None or sync[0] > start:
+        fetch_start = start
+        cache_result = 'miss'
+    else:
+        fetch_start = max(start, sync[1])
+        cache_result = 'partial' if fetch_start < end else 'hit'
+    if fetch_start < end:
+        try:
+            df_new = api.get_asset_history(fetch_start, end, currency, interval)
+        except UpstreamError as exc:
+            if sync is None:
+                raise
+            cache_result = 'stale'
+            logger.warning('Serving stored %s history for %s: %s', interval, currency, exc)
+        else:
+            if not df_new.empty:
+                models.save_price_history(currency, interval, fetch_start, df_new)
+    UPSTREAM_CACHE.inc(endpoint='coincap.history', result=cache_result)
+    return models.get_price_history(currency, interval, start, end)
+
+
+def fetch_asset_histories(
+    start: dt.datetime,
+    end: dt.datetime,
+    currencies: List[str],
+    interval: str = 'd1',
+    max_workers: int = PRICE_FETCH_WORKERS
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    # Histories keep the order of `currencies`; max_workers <= 1 fetches serially
+    def fetch(currency: str) -> pd.DataFrame:
+        return load_asset_history(start, end, currency, interval)
+
+    if max_workers <= 1 or len(currencies) <= 1:
+        results = {}
+        for currency in currencies:
+            try:
+                results[currency] = fetch(currency)
+            except Exception as exc:
+                results[currency] = exc
+    else:
+        workers = min(max_workers, len(currencies))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each task runs in a copy of the caller's context, so workers
+            # keep its upstream request priority
+            futures = {
+                currency: executor.submit(
+                    contextvars.copy_context().run, fetch, currency
+                )
+                for currency in currencies
+            }
+        results = {
+            currency: future.exception() or future.result()
+            for currency, future in futures.items()
+        }
+    histories, failures = {}, {}
+    for currency, result in results.items():
+        if isinstance(result, Exception):
+            failures[currency] = str(result)
+            result = pd.DataFrame(EMPTY_HISTORY).astype({
+                'priceUsd': 'float64', 'timestamp': 'datetime64[ms]'
+            })
+        elif result.empty:
+            failures[currency] = 'no data returned'
+        histories[currency] = result
+    return histories, failures
 
 
 def clean_price_data(
     start: dt.datetime,
     end: dt.datetime,
-    currencies: List[str]
+    currencies: List[str],
+    interval: str = 'd1',
+    max_workers: int = PRICE_FETCH_WORKERS
 ) -> pd.DataFrame:
-    list_of_dfs = []
-    for currency in currencies:
-        df = api.get_asset_history(start, end, currency)
-        df_cleaned = df.rename(columns={'priceUsd': f'{currency}'})
-        list_of_dfs.append(df_cleaned)
-    df_main_graph = (
-        ft.reduce(
-            lambda x, y: pd.merge(x, y, on=['timestamp'], how='outer'),
-            list_of_dfs
-        )
-        .fillna(0)
-        .sort_values(by=['timestamp'])
+    histories, failures = fetch_asset_histories(
+        start, end, currencies, interval=interval, max_workers=max_workers
     )
-    return df_main_graph
-
-
-def clean_ma_data(ma_windows: List[str], ma_types: List[str]) -> pd.DataFrame:
-    dfs_by_window = {}
-    for ma_window in ma_windows:
-        dfs_by_type = {}
-        for ma_type in ma_types:
-            dfs_by_type[ma_type] = api.get_ma_data(ma_window, ma_type)
-        dfs_by_window[ma_window] = (
-            pd
-            .merge(dfs_by_type['sma'], dfs_by_type['ema'], on='timestamp', how='left')
-            .rename(columns={'value_x': 'SMA', 'value_y': 'EMA'})
-            .sort_values(by=['timestamp'])
-        )
-    df_ma50 = dfs_by_window['50']
-    start_datetime = df_ma50["timestamp"].min()
-    end_datetime = df_ma50["timestamp"].max()
-    if (start_datetime is np.nan) and (end_datetime is np.nan):
-        return tuple(dfs_by_window.values())
-    else:
-        df_btc_price = api.get_asset_history(
-            start=df_ma50["timestamp"].min(),
-            end=df_ma50["timestamp"].max(),
-            currency='bitcoin',
-            interval='h1'
-        )
-        dfs_by_window_cleaned = {}
-        for ma_window in ma_windows:
-            dfs_by_window_cleaned[ma_window] = (
-                dfs_by_window[ma_window]
-                .merge(df_btc_price, on='timestamp', how='left')
-                .rename(columns={'priceUsd': 'BTC price'})
-            )
-        return tuple(dfs_by_window_cleaned.values())
+    for currency, reason in failures.items():
+        logger.warning('Price history for %s unavailable: %s', currency, reason)
+    return build_wide_price_frame(histories)
+
+
+def build_wide_price_frame(histories: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    # All series are aligned on the sorted union of their timestamps in one
+    # pass and stored as a single float32 block; missing bars stay NaN.
+    list_of_series = [
+        df
+        .drop_duplicates(subset=['timestamp'], keep='last')
+        .loc[:, ['timestamp', 'priceUsd']]
+        for df in histories.values()
+    ]
+    list_of_timestamps = [
+        df['timestamp'].to_numpy(dtype='datetime64[ms]')
+        for df in list_of_series
+    ]
+    timestamps = np.unique(
+        np.concatenate(list_of_timestamps)
+        if list_of_timestamps else np.array([], dtype='datetime64[ms]')
+    )
+    prices = np.full((len(timestamps), len(histories)), np.nan, dtype='float32')
+    for column, (df, series_timestamps) in enumerate(
+        zip(list_of_series, list_of_timestamps)
+    ):
+        rows = np.searchsorted(timestamps, series_timestamps)
+        prices[rows, column] = df['priceUsd'].to_numpy(dtype='float32')
+    df_wide = pd.DataFrame(prices, columns=list(histories.keys()), copy=False)
+    df_wide.insert(0, 'timestamp', timestamps)
+    return df_wide
 
 
 def clean_exchange_rates(date: dt.date, currency_names: List[str]) -> Dict[str, float]:
-    df = models.get_exchange_rates(date)
-    if df.empty:
+    rates = models.get_exchange_rates(date)
+    if rates is None:
         df = api.get_exchange_rates()
-        if not df.empty:
-            record = (
-                df
-                .astype({'symbol': 'str', 'rateUsd': 'float64'})
-                .loc[lambda x: (x['type'] == 'fiat') & (x['symbol'].isin(currency_names))]
-                .loc[:, ['symbol', 'rateUsd']]
-                .assign(rateUsd=lambda x: 1 / x['rateUsd'])
-                .round({'rateUsd': 4})
-                .set_index('symbol')
-                .T
-                .assign(date=date)
-                .to_dict('records')[0]
-            )
-            models.save_exchange_rates(record)
-    rates = df.loc[:, currency_names].to_dict('records')[0]
-    return rates
+        rates = (
+            df
+            .astype({'symbol': 'str', 'rateUsd': 'float64'})
+            .loc[lambda x: (x['type'] == 'fiat') & (x['symbol'].isin(currency_names))]
+            .loc[:, ['symbol', 'rateUsd']]
+            .assign(rateUsd=lambda x: 1 / x['rateUsd'])
+            .round({'rateUsd': 4})
+            .set_index('symbol')
+            .loc[:, 'rateUsd']
+            .to_dict()
+        )
+        models.save_exchange_rates(date, rates)
+    return {name: rates[name] for name in currency_names}
+
+
+def downsample_price_data(
+    df: pd.DataFrame,
+    currencies: Tuple[str, ...],
+    max_points: int
+) -> pd.DataFrame:
+    # Every series is reduced to at most max_points points with LTTB, so
+    # peaks survive; short (zoomed in) ranges keep full resolution.
+    # Returns the series in long format (timestamp, variable, value).
+    list_of_dfs = []
+    x = df['timestamp'].to_numpy(dtype='datetime64[ms]').astype('int64')
+    for currency in currencies:
+        y = df[currency].to_numpy(dtype='float64')
+        valid = ~np.isnan(y)
+        indices = np.flatnonzero(valid)[
+            lttb_indices(x[valid], y[valid], max_points)
+        ]
+        list_of_dfs.append(pd.DataFrame({
+            'timestamp': df['timestamp'].to_numpy()[indices],
+            'variable': currency,
+            'value': y[indices],
+        }))
+    if not list_of_dfs:
+        return pd.DataFrame({'timestamp': [], 'variable': [], 'value': []})
+    return pd.concat(list_of_dfs, ignore_index=True)
 
 
 def resample_df_fng(df: pd.DataFrame) -> pd.DataFrame:
@@ -95,6 +192,7 @@ def resample_df_fng(df: pd.DataFrame) -> pd.DataFrame:
     df_sampled = (
         df
         .loc[lambda x: x['timestamp'].isin(selected_dates)]
+        .sort_values(by=['timestamp'], ascending=False)
         .assign(Time=[
             "Now",
             "Yesterday",